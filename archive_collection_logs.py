@@ -17,6 +17,9 @@ from config import DB_CONFIG
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round-trip when streaming logs into the CSV export
+_EXPORT_PAGE_SIZE = 5000
+
 class CollectionLogsArchiver:
     def __init__(self):
         self.db = DatabaseManager()
@@ -77,8 +80,35 @@ class CollectionLogsArchiver:
             if cursor:
                 cursor.close()
     
-    def get_old_logs(self, days_old, status_filter=None):
-        """Get logs older than specified days"""
+    def count_old_logs(self, cutoff_date, status_filter=None):
+        """Count logs collected before cutoff_date"""
+        cursor = None
+        try:
+            if not self.db.connection:
+                logger.error("Database connection not available")
+                return 0
+            
+            cursor = self.db.connection.cursor()
+            
+            query = "SELECT COUNT(*) FROM collection_logs WHERE collected_at < %s"
+            params = [cutoff_date]
+            
+            if status_filter:
+                query += " AND status = %s"
+                params.append(status_filter)
+            
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
+            
+        except Exception as e:
+            logger.error(f"Error counting old logs: {e}")
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def get_old_logs(self, cutoff_date, status_filter=None, limit=None, after_id=0):
+        """Get logs collected before cutoff_date, optionally a page of them after after_id; read errors are raised"""
         cursor = None
         try:
             if not self.db.connection:
@@ -87,22 +117,24 @@ class CollectionLogsArchiver:
             
             cursor = self.db.connection.cursor(dictionary=True)
             
-            cutoff_date = datetime.now() - timedelta(days=days_old)
-            
             query = """
                 SELECT id, domain_name, status, error_message, collected_at,
                        processing_time, relationships_found, urls_discovered, 
                        url, agent_name
                 FROM collection_logs 
-                WHERE collected_at < %s
+                WHERE collected_at < %s AND id > %s
             """
-            params = [cutoff_date]
+            params = [cutoff_date, after_id]
             
             if status_filter:
                 query += " AND status = %s"
                 params.append(status_filter)
             
-            query += " ORDER BY collected_at ASC"
+            query += " ORDER BY id ASC"
+            
+            if limit:
+                query += " LIMIT %s"
+                params.append(limit)
             
             cursor.execute(query, params)
             logs = cursor.fetchall()
@@ -110,14 +142,26 @@ class CollectionLogsArchiver:
             return logs
             
         except Exception as e:
+            # A missing page would truncate the export, so never report it as empty
             logger.error(f"Error getting old logs: {e}")
-            return []
+            raise
         finally:
             if cursor:
                 cursor.close()
     
+    def iter_old_logs(self, cutoff_date, status_filter=None):
+        """Yield logs collected before cutoff_date, one page at a time"""
+        after_id = 0
+        while True:
+            page = self.get_old_logs(cutoff_date, status_filter, limit=_EXPORT_PAGE_SIZE, after_id=after_id)
+            yield from page
+            if len(page) < _EXPORT_PAGE_SIZE:
+                return
+            after_id = page[-1]['id']
+    
     def export_logs_to_csv(self, logs, filename):
-        """Export logs to CSV file"""
+        """Export logs to CSV file, writing rows as they are read; returns the row count, or None on failure"""
+        exported = 0
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                 fieldnames = [
@@ -134,16 +178,17 @@ class CollectionLogsArchiver:
                     if log_copy['collected_at']:
                         log_copy['collected_at'] = log_copy['collected_at'].strftime('%Y-%m-%d %H:%M:%S')
                     writer.writerow(log_copy)
+                    exported += 1
             
-            logger.info(f"Exported {len(logs)} logs to {filename}")
-            return True
+            logger.info(f"Exported {exported} logs to {filename}")
+            return exported
             
         except Exception as e:
             logger.error(f"Error exporting logs to CSV: {e}")
-            return False
+            return None
     
-    def delete_old_logs(self, days_old, status_filter=None, dry_run=False):
-        """Delete logs older than specified days"""
+    def delete_old_logs(self, cutoff_date, status_filter=None, dry_run=False):
+        """Delete logs collected before cutoff_date"""
         cursor = None
         try:
             if not self.db.connection:
@@ -152,8 +197,6 @@ class CollectionLogsArchiver:
             
             cursor = self.db.connection.cursor()
             
-            cutoff_date = datetime.now() - timedelta(days=days_old)
-            
             query = "DELETE FROM collection_logs WHERE collected_at < %s"
             params = [cutoff_date]
             
@@ -166,13 +209,13 @@ class CollectionLogsArchiver:
                 count_query = query.replace("DELETE FROM", "SELECT COUNT(*) FROM")
                 cursor.execute(count_query, params)
                 count = cursor.fetchone()[0]
-                logger.info(f"Would delete {count} logs older than {days_old} days")
+                logger.info(f"Would delete {count} logs collected before {cutoff_date}")
                 return count
             else:
                 cursor.execute(query, params)
                 deleted_count = cursor.rowcount
                 self.db.connection.commit()
-                logger.info(f"Successfully deleted {deleted_count} logs older than {days_old} days")
+                logger.info(f"Successfully deleted {deleted_count} logs collected before {cutoff_date}")
                 return deleted_count
                 
         except Exception as e:
@@ -189,21 +232,24 @@ class CollectionLogsArchiver:
         logger.info(f"{'DRY RUN' if dry_run else 'ARCHIVING'} - Collection logs older than {days_old} days")
         logger.info("=" * 60)
         
-        # Get old logs
-        old_logs = self.get_old_logs(days_old, status_filter)
+        # One cutoff for the count, the export and the delete, so they all cover the same rows
+        cutoff_date = datetime.now() - timedelta(days=days_old)
+        
+        # Count old logs; the export streams them instead of loading them all
+        old_count = self.count_old_logs(cutoff_date, status_filter)
         
-        if not old_logs:
+        if not old_count:
             logger.info("No old logs found to archive")
             return
         
-        logger.info(f"Found {len(old_logs)} logs to archive")
+        logger.info(f"Found {old_count} logs to archive")
         
         # Show some examples
         logger.info("Example logs to archive:")
-        for log in old_logs[:5]:
+        for log in self.get_old_logs(cutoff_date, status_filter, limit=5):
             logger.info(f"  - {log['domain_name']} ({log['status']}) - {log['collected_at']}")
-        if len(old_logs) > 5:
-            logger.info(f"  ... and {len(old_logs) - 5} more")
+        if old_count > 5:
+            logger.info(f"  ... and {old_count - 5} more")
         
         # Export to CSV if requested
         if export_csv and not dry_run:
@@ -214,17 +260,21 @@ class CollectionLogsArchiver:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = os.path.join(archive_dir, f"collection_logs_archive_{timestamp}.csv")
             
-            if self.export_logs_to_csv(old_logs, filename):
-                logger.info(f"Logs exported to {filename}")
-            else:
-                logger.error("Failed to export logs to CSV")
+            exported = self.export_logs_to_csv(self.iter_old_logs(cutoff_date, status_filter), filename)
+            if exported is None:
+                logger.error("Failed to export logs to CSV, keeping logs in the database")
+                return
+            if exported != old_count:
+                logger.error(f"Exported {exported} logs but expected {old_count}, keeping logs in the database")
+                return
+            logger.info(f"Logs exported to {filename}")
         
         # Delete old logs
-        deleted_count = self.delete_old_logs(days_old, status_filter, dry_run)
+        deleted_count = self.delete_old_logs(cutoff_date, status_filter, dry_run)
         
         logger.info("=" * 60)
         if dry_run:
-            logger.info(f"Dry run completed - would archive {len(old_logs)} logs")
+            logger.info(f"Dry run completed - would archive {old_count} logs")
         else:
             logger.info(f"Archiving completed - archived {deleted_count} logs")
     
@@ -257,27 +307,28 @@ class CollectionLogsArchiver:
         logger.info(f"{'DRY RUN' if dry_run else 'CLEANUP'} - {status} logs older than {days_old} days")
         logger.info("=" * 60)
         
-        old_logs = self.get_old_logs(days_old, status)
+        cutoff_date = datetime.now() - timedelta(days=days_old)
+        old_count = self.count_old_logs(cutoff_date, status)
         
-        if not old_logs:
+        if not old_count:
             logger.info(f"No {status} logs found older than {days_old} days")
             return
         
-        logger.info(f"Found {len(old_logs)} {status} logs to clean up")
+        logger.info(f"Found {old_count} {status} logs to clean up")
         
         # Show some examples
         logger.info(f"Example {status} logs to clean up:")
-        for log in old_logs[:5]:
+        for log in self.get_old_logs(cutoff_date, status, limit=5):
             logger.info(f"  - {log['domain_name']} - {log['collected_at']}")
-        if len(old_logs) > 5:
-            logger.info(f"  ... and {len(old_logs) - 5} more")
+        if old_count > 5:
+            logger.info(f"  ... and {old_count - 5} more")
         
         # Delete logs
-        deleted_count = self.delete_old_logs(days_old, status, dry_run)
+        deleted_count = self.delete_old_logs(cutoff_date, status, dry_run)
         
         logger.info("=" * 60)
         if dry_run:
-            logger.info(f"Dry run completed - would clean up {len(old_logs)} {status} logs")
+            logger.info(f"Dry run completed - would clean up {old_count} {status} logs")
         else:
             logger.info(f"Cleanup completed - removed {deleted_count} {status} logs")
     
@@ -26,6 +26,7 @@ COLLECTION_CONFIG = {
     'internal_agent_name': os.getenv('COLLECTION_INTERNAL_AGENT_NAME', f"{os.uname().nodename}-{os.getpid()}"),
     'respect_robots_txt': os.getenv('COLLECTION_RESPECT_ROBOTS_TXT', 'True').lower() == 'true',
     'parallel_workers': int(os.getenv('COLLECTION_PARALLEL_WORKERS', 1)),  # Number of parallel workers
+    'parallel_domains': int(os.getenv('COLLECTION_PARALLEL_DOMAINS', 4)),  # Domains backfilled concurrently by fill_missing_domain_data.py
 }
 
 # Data collection configuration
@@ -35,7 +36,9 @@ DATA_CONFIG = {
     'collect_geolocation': os.getenv('DATA_COLLECT_GEOLOCATION', 'True').lower() == 'true',
     'collect_screenshots': os.getenv('DATA_COLLECT_SCREENSHOTS', 'False').lower() == 'true',
     'maxmind_db_path': os.getenv('MAXMIND_DB_PATH', './GeoLite2-City.mmdb'),
+    'maxmind_asn_db_path': os.getenv('MAXMIND_ASN_DB_PATH', './GeoLite2-ASN.mmdb'),  # Local ASN lookups; ipinfo.io is used if missing
     'screenshot_dir': os.getenv('SCREENSHOT_DIR', './resources/screenshots'),
+    'screenshot_images': os.getenv('DATA_SCREENSHOT_IMAGES', 'True').lower() == 'true',  # Load images when taking screenshots
     'ipinfo_fallback': os.getenv('DATA_COLLECT_IPINFO_FALLBACK', 'True').lower() == 'true',
     'ipinfo_token': os.getenv('DATA_COLLECT_IPINFO_TOKEN', None),
 }
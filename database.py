@@ -1,15 +1,31 @@
 import mysql.connector
 from mysql.connector import Error
 import logging
+import json
+import os
+import time
 from datetime import datetime, timedelta, date
-from config import DB_CONFIG
+from config import DB_CONFIG, COLLECTION_CONFIG
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# discovery_queue rows are spread over this many shards (by URL hash); each parallel worker
+# owns the shards congruent to its id and claims from them before the whole queue
+_QUEUE_SHARDS = 16
+
+# Duplicate column / duplicate key name / key already dropped: another process applied
+# the same migration first
+_ALREADY_MIGRATED_ERRNOS = (1060, 1061, 1091)
+
 class DatabaseManager:
     def __init__(self):
         self.connection = None
+        self._prepared_cursors = {}
+        # Identifies the queue items this process claimed; the agent name is shared by forked workers
+        self.worker_name = f"{COLLECTION_CONFIG['internal_agent_name']}-{os.getpid()}"[:100]
+        # Cleared if the server does not support FOR UPDATE SKIP LOCKED (MySQL < 8.0, MariaDB < 10.6)
+        self._skip_locked = True
         self.connect()
         self.create_tables()
     
@@ -30,12 +46,34 @@ class DatabaseManager:
                 'connection_timeout': 60,
             })
             
+            self._prepared_cursors.clear()
             self.connection = mysql.connector.connect(**connection_config)
             logger.info("Database connection established successfully")
         except Error as e:
             logger.error(f"Error connecting to MySQL: {e}")
             raise
     
+    def _prepared_cursor(self, query):
+        """Return a cached server-side prepared cursor for a hot per-item query.
+
+        The statement is prepared once per connection and re-executed on later calls,
+        so the server skips parsing it again.
+        """
+        cursor = self._prepared_cursors.get(query)
+        if cursor is None:
+            cursor = self.connection.cursor(prepared=True)
+            self._prepared_cursors[query] = cursor
+        return cursor
+    
+    def _discard_prepared_cursor(self, query):
+        """Drop a prepared cursor after an error so the next call prepares a fresh one"""
+        cursor = self._prepared_cursors.pop(query, None)
+        if cursor:
+            try:
+                cursor.close()
+            except Error:
+                pass
+    
     def create_tables(self):
         """Create necessary tables if they don't exist"""
         try:
@@ -98,7 +136,7 @@ class DatabaseManager:
             """)
             
             # Discovery queue table for auto-discovered URLs
-            cursor.execute("""
+            cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS discovery_queue (
                     id INT AUTO_INCREMENT PRIMARY KEY,
                     url VARCHAR(500) NOT NULL,
@@ -111,11 +149,16 @@ class DatabaseManager:
                     processed_at TIMESTAMP NULL,
                     error_message TEXT,
                     depth INT DEFAULT 0,
+                    claimed_by VARCHAR(100),
+                    shard TINYINT UNSIGNED AS (CRC32(url) % {_QUEUE_SHARDS}) STORED,
                     FOREIGN KEY (source_domain_id) REFERENCES domains(id) ON DELETE SET NULL,
                     INDEX idx_status (status),
                     INDEX idx_priority (priority),
                     INDEX idx_domain_name (domain_name),
                     INDEX idx_discovered_at (discovered_at),
+                    INDEX idx_claim_order (status, priority DESC, discovered_at),
+                    INDEX idx_domain_status (domain_name, status),
+                    INDEX idx_shard_claim_order (shard, status, priority DESC, discovered_at),
                     UNIQUE KEY unique_url (url)
                 )
             """)
@@ -154,6 +197,28 @@ class DatabaseManager:
                 )
             """)
             
+            # robots.txt rules shared between workers so each host is fetched once per day
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS robots_rules (
+                    domain_name VARCHAR(255) PRIMARY KEY,
+                    rules MEDIUMTEXT NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_fetched_at (fetched_at)
+                )
+            """)
+            
+            # Checkpoints so long-running maintenance jobs can resume where they stopped
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_checkpoint (
+                    job_name VARCHAR(100) PRIMARY KEY,
+                    last_id BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Add columns and indexes introduced after a table was first created
+            self._ensure_schema(cursor)
+            
             self.connection.commit()
             logger.info("Database tables created successfully")
             
@@ -168,28 +233,87 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
+    def _alter_table(self, cursor, statement):
+        """Run a schema migration, ignoring it if a concurrent process already applied it"""
+        try:
+            cursor.execute(statement)
+        except Error as e:
+            if e.errno not in _ALREADY_MIGRATED_ERRNOS:
+                raise
+            logger.info(f"Schema change already applied by another process: {e}")
+    
+    def _ensure_schema(self, cursor):
+        """Create columns and indexes that are missing on tables created by older versions"""
+        columns = {
+            ('discovery_queue', 'claimed_by'): 'VARCHAR(100) NULL',
+            ('discovery_queue', 'shard'): f'TINYINT UNSIGNED AS (CRC32(url) % {_QUEUE_SHARDS}) STORED',
+        }
+        cursor.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name IN ('discovery_queue')
+        """)
+        existing = {(table, column) for table, column in cursor.fetchall()}
+        for (table, column), definition in columns.items():
+            if (table, column) not in existing:
+                logger.info(f"Adding column {column} to {table}")
+                self._alter_table(cursor, f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        
+        # The claim orders by priority DESC, discovered_at ASC; the indexes serving it must match
+        indexes = {
+            ('discovery_queue', 'idx_claim_order'): '(status, priority DESC, discovered_at)',
+            ('discovery_queue', 'idx_domain_status'): '(domain_name, status)',
+            ('discovery_queue', 'idx_shard_claim_order'): '(shard, status, priority DESC, discovered_at)',
+        }
+        # All-ascending versions of the claim indexes, replaced by the ones above
+        obsolete_indexes = (
+            ('discovery_queue', 'idx_status_priority'),
+            ('discovery_queue', 'idx_shard_status_priority'),
+        )
+        cursor.execute("""
+            SELECT DISTINCT table_name, index_name FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name IN ('discovery_queue')
+        """)
+        existing = {(table, index) for table, index in cursor.fetchall()}
+        for (table, index), columns in indexes.items():
+            if (table, index) not in existing:
+                logger.info(f"Adding index {index} to {table}")
+                self._alter_table(cursor, f"ALTER TABLE {table} ADD INDEX {index} {columns}")
+        for table, index in obsolete_indexes:
+            if (table, index) in existing:
+                logger.info(f"Dropping index {index} from {table}")
+                self._alter_table(cursor, f"ALTER TABLE {table} DROP INDEX {index}")
+    
+    def _normalize_domain_data(self, domain_data):
+        """Normalize collected domain data in place for the domains table"""
+        # Normalize date fields to ensure MySQL DATE compatibility
+        def normalize_date(val):
+            if val is None:
+                return None
+            if isinstance(val, date) and not isinstance(val, datetime):
+                return val
+            if isinstance(val, datetime):
+                return val.date()
+            if isinstance(val, str):
+                for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%b-%Y"):
+                    try:
+                        return datetime.strptime(val, fmt).date()
+                    except ValueError:
+                        continue
+            return None
+        domain_data['created_date'] = normalize_date(domain_data.get('created_date'))
+        domain_data['expiry_date'] = normalize_date(domain_data.get('expiry_date'))
+        
+        # Nameservers are collected as a list and stored as JSON text
+        if isinstance(domain_data.get('nameservers'), (list, tuple)):
+            domain_data['nameservers'] = json.dumps(list(domain_data['nameservers']))
+        return domain_data
+    
     def insert_domain(self, domain_data):
         """Insert or update domain information"""
         try:
             cursor = self.connection.cursor()
 
-            # Normalize date fields to ensure MySQL DATE compatibility
-            def normalize_date(val):
-                if val is None:
-                    return None
-                if isinstance(val, date) and not isinstance(val, datetime):
-                    return val
-                if isinstance(val, datetime):
-                    return val.date()
-                if isinstance(val, str):
-                    for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%b-%Y"):
-                        try:
-                            return datetime.strptime(val, fmt).date()
-                        except ValueError:
-                            continue
-                return None
-            domain_data['created_date'] = normalize_date(domain_data.get('created_date'))
-            domain_data['expiry_date'] = normalize_date(domain_data.get('expiry_date'))
+            self._normalize_domain_data(domain_data)
             
             query = """
                 INSERT INTO domains (
@@ -200,6 +324,7 @@ class DatabaseManager:
                 ) VALUES (
                     %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                 ) ON DUPLICATE KEY UPDATE
+                    id = LAST_INSERT_ID(id),
                     title = VALUES(title),
                     description = VALUES(description),
                     favicon_url = VALUES(favicon_url),
@@ -243,9 +368,9 @@ class DatabaseManager:
                 domain_data.get('tags')
             ))
             
-            # If lastrowid is 0, it means the row already existed and was updated
-            # We need to fetch the actual ID
-            if cursor.lastrowid == 0:
+            # id = LAST_INSERT_ID(id) makes lastrowid carry the existing row's ID on update,
+            # so the extra SELECT is only a fallback
+            if not cursor.lastrowid:
                 cursor.execute("SELECT id FROM domains WHERE domain_name = %s", (domain_data.get('domain_name'),))
                 result = cursor.fetchone()
                 domain_id = result[0] if result else None
@@ -264,6 +389,49 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
+    def bulk_upsert_domains(self, rows):
+        """Insert or update several domains in one transaction.
+
+        rows: iterable of domain data dicts. Unlike insert_domain, a NULL value keeps the
+        column's existing value, so partial data can be merged into complete rows.
+        """
+        rows = [self._normalize_domain_data(dict(row)) for row in rows]
+        if not rows:
+            return 0
+        columns = (
+            'domain_name', 'title', 'description', 'favicon_url', 'created_date',
+            'expiry_date', 'registrar', 'nameservers', 'asn', 'asn_description',
+            'ssl_valid', 'ssl_expiry', 'country', 'ip_address', 'latitude',
+            'longitude', 'category', 'tags'
+        )
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            
+            updates = ',\n                    '.join(
+                f"{column} = COALESCE(VALUES({column}), {column})" for column in columns[1:]
+            )
+            query = f"""
+                INSERT INTO domains ({', '.join(columns)})
+                VALUES ({', '.join(['%s'] * len(columns))})
+                ON DUPLICATE KEY UPDATE
+                    {updates},
+                    updated_at = CURRENT_TIMESTAMP
+            """
+            
+            cursor.executemany(query, [tuple(row.get(column) for column in columns) for row in rows])
+            self.connection.commit()
+            logger.debug(f"Inserted/updated {len(rows)} domains")
+            return len(rows)
+            
+        except Error as e:
+            logger.error(f"Error upserting domains: {e}")
+            self.connection.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+    
     def insert_relationship(self, source_domain_id, target_domain_id, relationship_data):
         """Insert relationship between domains"""
         try:
@@ -309,6 +477,41 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
+    def insert_relationships_bulk(self, rows):
+        """Insert multiple relationships in a single round-trip.
+
+        rows: iterable of (source_domain_id, target_domain_id, relationship_type, link_text, link_url) tuples
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+
+            query = """
+                INSERT INTO relationships (
+                    source_domain_id, target_domain_id, relationship_type, 
+                    link_text, link_url
+                ) VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    link_text = VALUES(link_text),
+                    link_url = VALUES(link_url)
+            """
+
+            cursor.executemany(query, rows)
+            self.connection.commit()
+            logger.debug(f"Inserted/updated {len(rows)} relationships")
+            return len(rows)
+
+        except Error as e:
+            logger.error(f"Error inserting relationships: {e}")
+            self.connection.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
     def add_to_discovery_queue(self, url, domain_name, source_domain_id=None, depth=0, priority=1):
         """Add URL to discovery queue"""
         try:
@@ -333,12 +536,50 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
-    def get_next_from_queue(self, limit=10):
-        """Get next URLs from discovery queue with atomic marking"""
+    def add_many_to_discovery_queue(self, rows):
+        """Add multiple URLs to discovery queue in a single round-trip.
+
+        rows: iterable of (url, domain_name, source_domain_id, depth, priority) tuples
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+
+            query = """
+                INSERT INTO discovery_queue (
+                    url, domain_name, source_domain_id, depth, priority
+                ) VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    priority = GREATEST(discovery_queue.priority, VALUES(priority)),
+                    depth = LEAST(discovery_queue.depth, VALUES(depth))
+            """
+
+            cursor.executemany(query, rows)
+            self.connection.commit()
+            return len(rows)
+
+        except Error as e:
+            logger.error(f"Error adding batch to discovery queue: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_next_from_queue(self, limit=10, worker_id=None, num_workers=1):
+        """Get next URLs from discovery queue with atomic marking, preferring the worker's own shards"""
         cursor = None
         max_retries = 3
         retry_count = 0
         
+        # Every shard belongs to exactly one of the workers 0..num_workers-1
+        own_shards = []
+        if worker_id is not None and num_workers > 1:
+            own_shards = [shard for shard in range(_QUEUE_SHARDS) if shard % num_workers == worker_id % num_workers]
+        
         while retry_count < max_retries:
             try:
                 # Ensure connection is active
@@ -356,28 +597,37 @@ class DatabaseManager:
                 # Start transaction
                 self.connection.start_transaction()
                 
-                # First, get the items we want to process
-                select_query = """
+                # First, get the items we want to process; SKIP LOCKED lets concurrent workers
+                # claim different rows instead of queueing behind each other's locks
+                select_query = f"""
                     SELECT id, url, domain_name, source_domain_id, depth, priority
                     FROM discovery_queue 
-                    WHERE status = 'pending'
+                    WHERE status = 'pending'{{shard_filter}}
                     ORDER BY priority DESC, discovered_at ASC
                     LIMIT %s
-                    FOR UPDATE
+                    FOR UPDATE{' SKIP LOCKED' if self._skip_locked else ''}
                 """
                 
-                cursor.execute(select_query, (limit,))
-                results = cursor.fetchall()
+                results = []
+                if own_shards:
+                    # Claim from this worker's own shards first
+                    shard_filter = f" AND shard IN ({','.join(['%s'] * len(own_shards))})"
+                    cursor.execute(select_query.format(shard_filter=shard_filter), (*own_shards, limit))
+                    results = cursor.fetchall()
+                if not results:
+                    # Own shards empty (or none owned): take work from anywhere in the queue
+                    cursor.execute(select_query.format(shard_filter=''), (limit,))
+                    results = cursor.fetchall()
                 
                 if results:
-                    # Mark these specific items as processing
+                    # Mark these specific items as processing and owned by this worker
                     ids = [str(r['id']) for r in results]
                     update_query = f"""
                         UPDATE discovery_queue 
-                        SET status = 'processing', processed_at = CURRENT_TIMESTAMP
+                        SET status = 'processing', processed_at = CURRENT_TIMESTAMP, claimed_by = %s
                         WHERE id IN ({','.join(ids)})
                     """
-                    cursor.execute(update_query)
+                    cursor.execute(update_query, (self.worker_name,))
                     self.connection.commit()
                     return results
                 else:
@@ -385,6 +635,14 @@ class DatabaseManager:
                     return []
                 
             except Error as e:
+                # Older servers reject SKIP LOCKED with a syntax error; fall back to plain FOR UPDATE
+                if self._skip_locked and e.errno == 1064:
+                    logger.warning("Server does not support SKIP LOCKED, falling back to FOR UPDATE")
+                    self._skip_locked = False
+                    if self.connection.in_transaction:
+                        self.connection.rollback()
+                    continue
+                
                 retry_count += 1
                 logger.warning(f"Error getting from queue (attempt {retry_count}/{max_retries}): {e}")
                 
@@ -401,7 +659,6 @@ class DatabaseManager:
                     return []
                 
                 # Wait a bit before retrying
-                import time
                 time.sleep(0.1 * retry_count)  # Exponential backoff
                 
             finally:
@@ -419,10 +676,10 @@ class DatabaseManager:
             query = """
                 UPDATE discovery_queue 
                 SET status = %s, processed_at = CURRENT_TIMESTAMP, error_message = %s
-                WHERE id = %s
+                WHERE id = %s AND (claimed_by IS NULL OR claimed_by = %s)
             """
             
-            cursor.execute(query, (status, error_message, queue_id))
+            cursor.execute(query, (status, error_message, queue_id, self.worker_name))
             self.connection.commit()
             
         except Error as e:
@@ -432,6 +689,37 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
+    def bulk_mark_completed(self, completions):
+        """Mark several queue items as completed or failed in one transaction.
+
+        completions: iterable of (queue_id, success, error_message) tuples
+        """
+        rows = [('completed' if success else 'failed', error_message, queue_id, self.worker_name)
+                for queue_id, success, error_message in completions]
+        if not rows:
+            return 0
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            
+            query = """
+                UPDATE discovery_queue 
+                SET status = %s, processed_at = CURRENT_TIMESTAMP, error_message = %s
+                WHERE id = %s AND (claimed_by IS NULL OR claimed_by = %s)
+            """
+            
+            cursor.executemany(query, rows)
+            self.connection.commit()
+            return len(rows)
+            
+        except Error as e:
+            logger.error(f"Error marking queue items: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+    
     def mark_queue_item_skipped(self, queue_id, reason=None):
         """Mark queue item as skipped (for business logic reasons)"""
         try:
@@ -440,10 +728,10 @@ class DatabaseManager:
             query = """
                 UPDATE discovery_queue 
                 SET status = 'skipped', processed_at = CURRENT_TIMESTAMP, error_message = %s
-                WHERE id = %s
+                WHERE id = %s AND (claimed_by IS NULL OR claimed_by = %s)
             """
             
-            cursor.execute(query, (reason, queue_id))
+            cursor.execute(query, (reason, queue_id, self.worker_name))
             self.connection.commit()
             
         except Error as e:
@@ -461,10 +749,10 @@ class DatabaseManager:
             query = """
                 UPDATE discovery_queue 
                 SET status = 'pending', processed_at = NULL, error_message = %s
-                WHERE id = %s
+                WHERE id = %s AND (claimed_by IS NULL OR claimed_by = %s)
             """
             
-            cursor.execute(query, (reason, queue_id))
+            cursor.execute(query, (reason, queue_id, self.worker_name))
             self.connection.commit()
             
         except Error as e:
@@ -474,6 +762,32 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
+    def mark_queue_items_interrupted(self, queue_ids, reason="Processing interrupted"):
+        """Reset several processing queue items to pending with one statement"""
+        queue_ids = list(queue_ids)
+        if not queue_ids:
+            return 0
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            placeholders = ', '.join(['%s'] * len(queue_ids))
+            cursor.execute(f"""
+                UPDATE discovery_queue 
+                SET status = 'pending', processed_at = NULL, error_message = %s
+                WHERE id IN ({placeholders}) AND status = 'processing'
+                AND (claimed_by IS NULL OR claimed_by = %s)
+            """, [reason] + queue_ids + [self.worker_name])
+            self.connection.commit()
+            return cursor.rowcount
+            
+        except Error as e:
+            logger.error(f"Error marking queue items as interrupted: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+    
     def is_url_in_queue(self, url, exclude_id=None):
         """Check if URL is already in the discovery queue"""
         try:
@@ -491,95 +805,229 @@ class DatabaseManager:
             if cursor:
                 cursor.close()
     
-    def is_url_already_processed(self, url):
-        """Check if URL has already been processed"""
+    def filter_urls_not_in_queue(self, urls):
+        """Return the subset of urls that are not pending or processing in the discovery queue"""
+        urls = list(urls)
+        if not urls:
+            return []
+        cursor = None
         try:
             cursor = self.connection.cursor()
-            cursor.execute("SELECT id FROM url_processing_history WHERE url = %s", (url,))
-            result = cursor.fetchone()
-            return result is not None
+            placeholders = ', '.join(['%s'] * len(urls))
+            cursor.execute(f"""
+                SELECT url FROM discovery_queue
+                WHERE url IN ({placeholders}) AND status IN ('pending', 'processing')
+            """, urls)
+            present = {row[0] for row in cursor.fetchall()}
+            return [url for url in urls if url not in present]
         except Error as e:
-            logger.error(f"Error checking URL processing history: {e}")
-            return False
+            logger.error(f"Error checking URLs in queue: {e}")
+            return urls
         finally:
             if cursor:
                 cursor.close()
     
+    def is_url_already_processed(self, url):
+        """Check if URL has already been processed"""
+        query = "SELECT id FROM url_processing_history WHERE url = %s"
+        try:
+            cursor = self._prepared_cursor(query)
+            cursor.execute(query, (url,))
+            return bool(cursor.fetchall())
+        except Error as e:
+            logger.error(f"Error checking URL processing history: {e}")
+            self._discard_prepared_cursor(query)
+            return False
+    
     def record_url_processing(self, url, domain_name, status='success', links_found=0):
         """Record URL processing in history"""
+        query = """
+            INSERT INTO url_processing_history (
+                url, domain_name, status, links_found
+            ) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                processed_at = CURRENT_TIMESTAMP,
+                status = VALUES(status),
+                links_found = VALUES(links_found)
+        """
         try:
-            cursor = self.connection.cursor()
-            
-            query = """
-                INSERT INTO url_processing_history (
-                    url, domain_name, status, links_found
-                ) VALUES (%s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    processed_at = CURRENT_TIMESTAMP,
-                    status = VALUES(status),
-                    links_found = VALUES(links_found)
-            """
-            
+            cursor = self._prepared_cursor(query)
             cursor.execute(query, (url, domain_name, status, links_found))
             self.connection.commit()
             
         except Error as e:
             logger.error(f"Error recording URL processing: {e}")
+            self._discard_prepared_cursor(query)
             self.connection.rollback()
-        finally:
-            if cursor:
-                cursor.close()
     
     def get_domain_processing_count(self, domain_name):
         """Get count of URLs processed for a domain"""
+        query = "SELECT COUNT(*) FROM url_processing_history WHERE domain_name = %s"
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM url_processing_history WHERE domain_name = %s", (domain_name,))
-            result = cursor.fetchone()
-            return result[0] if result else 0
+            cursor = self._prepared_cursor(query)
+            cursor.execute(query, (domain_name,))
+            result = cursor.fetchall()
+            return result[0][0] if result else 0
         except Error as e:
             logger.error(f"Error getting domain processing count: {e}")
+            self._discard_prepared_cursor(query)
             return 0
+    
+    def get_domain_processing_counts(self, domain_names):
+        """Get counts of URLs processed for several domains; returns a dict of domain_name -> count"""
+        domain_names = list(domain_names)
+        if not domain_names:
+            return {}
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            placeholders = ', '.join(['%s'] * len(domain_names))
+            cursor.execute(f"""
+                SELECT domain_name, COUNT(*) FROM url_processing_history
+                WHERE domain_name IN ({placeholders})
+                GROUP BY domain_name
+            """, domain_names)
+            return dict(cursor.fetchall())
+        except Error as e:
+            logger.error(f"Error getting domain processing counts: {e}")
+            return {}
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def get_domain_ids(self, domain_names):
+        """Get domain IDs for several domain names; returns a dict of domain_name -> id for those that exist"""
+        domain_names = list(domain_names)
+        if not domain_names:
+            return {}
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            placeholders = ', '.join(['%s'] * len(domain_names))
+            cursor.execute(f"SELECT domain_name, id FROM domains WHERE domain_name IN ({placeholders})", domain_names)
+            return dict(cursor.fetchall())
+        except Error as e:
+            logger.error(f"Error getting domain IDs: {e}")
+            return {}
         finally:
             if cursor:
                 cursor.close()
     
     def get_domain_id(self, domain_name):
         """Get domain ID by domain name"""
+        query = "SELECT id FROM domains WHERE domain_name = %s"
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT id FROM domains WHERE domain_name = %s", (domain_name,))
-            result = cursor.fetchone()
-            return result[0] if result else None
+            cursor = self._prepared_cursor(query)
+            cursor.execute(query, (domain_name,))
+            result = cursor.fetchall()
+            return result[0][0] if result else None
         except Error as e:
             logger.error(f"Error getting domain ID: {e}")
+            self._discard_prepared_cursor(query)
             return None
+    
+    def get_robots_rules(self, domain_names, max_age):
+        """Get stored robots.txt rules younger than max_age seconds; returns a dict of domain_name -> [(type, value), ...]"""
+        domain_names = list(domain_names)
+        if not domain_names:
+            return {}
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            placeholders = ', '.join(['%s'] * len(domain_names))
+            cursor.execute(f"""
+                SELECT domain_name, rules FROM robots_rules
+                WHERE domain_name IN ({placeholders})
+                AND fetched_at > NOW() - INTERVAL %s SECOND
+            """, domain_names + [int(max_age)])
+            return {
+                domain_name: [tuple(rule) for rule in json.loads(rules)]
+                for domain_name, rules in cursor.fetchall()
+            }
+        except (Error, ValueError) as e:
+            logger.error(f"Error getting robots.txt rules: {e}")
+            return {}
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def save_robots_rules(self, rows):
+        """Store robots.txt rules for several domains.
+
+        rows: iterable of (domain_name, [(type, value), ...]) tuples
+        """
+        rows = [(domain_name, json.dumps(rules)) for domain_name, rules in rows]
+        if not rows:
+            return 0
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany("""
+                INSERT INTO robots_rules (domain_name, rules) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE
+                    rules = VALUES(rules),
+                    fetched_at = CURRENT_TIMESTAMP
+            """, rows)
+            self.connection.commit()
+            return len(rows)
+        except Error as e:
+            logger.error(f"Error saving robots.txt rules: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def get_backfill_checkpoint(self, job_name):
+        """Get the last processed ID recorded for a backfill job (0 if none)"""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT last_id FROM backfill_checkpoint WHERE job_name = %s", (job_name,))
+            result = cursor.fetchone()
+            return result[0] if result else 0
+        except Error as e:
+            logger.error(f"Error getting backfill checkpoint: {e}")
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+    
+    def save_backfill_checkpoint(self, job_name, last_id):
+        """Record the last processed ID for a backfill job"""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""
+                INSERT INTO backfill_checkpoint (job_name, last_id) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)
+            """, (job_name, last_id))
+            self.connection.commit()
+        except Error as e:
+            logger.error(f"Error saving backfill checkpoint: {e}")
+            self.connection.rollback()
         finally:
             if cursor:
                 cursor.close()
     
     def update_collection_log(self, domain_name, status, error_message=None, processing_time=None, relationships_found=0, urls_discovered=0, url=None, agent_name=None):
         """Update collection log with URL and agent information"""
+        query = """
+            INSERT INTO collection_logs (
+                domain_name, status, error_message, processing_time, relationships_found, urls_discovered, url, agent_name
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
         try:
-            cursor = self.connection.cursor()
-
             processing_time = round(float(processing_time), 3) if processing_time else None
-
-            query = """
-                INSERT INTO collection_logs (
-                    domain_name, status, error_message, processing_time, relationships_found, urls_discovered, url, agent_name
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
             
+            cursor = self._prepared_cursor(query)
             cursor.execute(query, (domain_name, status, error_message, processing_time, relationships_found, urls_discovered, url, agent_name))
             self.connection.commit()
             
         except Error as e:
             logger.error(f"Error updating collection log: {e}")
+            self._discard_prepared_cursor(query)
             self.connection.rollback()
-        finally:
-            if cursor:
-                cursor.close()
     
     def get_queue_stats(self):
         """Get queue statistics"""
@@ -688,6 +1136,8 @@ class DatabaseManager:
     
     def close(self):
         """Close database connection"""
+        for query in list(self._prepared_cursors):
+            self._discard_prepared_cursor(query)
         if self.connection and self.connection.is_connected():
             try:
                 # Rollback any active transaction before closing
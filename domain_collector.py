@@ -1,11 +1,14 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import logging
 import re
 import socket
 import ssl
-from urllib.parse import urljoin, urlparse, parse_qs
-from bs4 import BeautifulSoup, Tag
+import threading
+from collections import deque, namedtuple
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer, Tag
 import whois
 import tldextract
 from geopy.geocoders import Nominatim
@@ -14,8 +17,10 @@ import dns.resolver
 from config import COLLECTION_CONFIG, DATA_CONFIG, AUTO_UPDATE_CONFIG
 from database import DatabaseManager
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, date
-import json
+from functools import cached_property, lru_cache
+from itertools import chain
 import geoip2.database
 from version import __version__
 from auto_update import AutoUpdate, graceful_restart_callback
@@ -23,12 +28,174 @@ from auto_update import AutoUpdate, graceful_restart_callback
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A URL found while crawling, queued by add_discovered_urls_to_queue; a depth of None
+# means the depth passed to that call applies
+DiscoveredUrl = namedtuple('DiscoveredUrl', ('url', 'domain', 'source_domain_id', 'depth'), defaults=(None,))
+
+# Category heuristics, checked in order; the first category with a matching keyword wins
+_CATEGORY_KEYWORDS = (
+    ('blog', ('blog', 'post', 'journal')),
+    ('ecommerce', ('shop', 'store', 'buy', 'ecommerce', 'cart', 'product', 'sale', 'deal', 'outlet', 'retail', 'market')),
+    ('news', ('news', 'media', 'press', 'magazine', 'gazette', 'bulletin', 'headline', 'reporter', 'newspaper')),
+    ('forum', ('forum', 'community', 'discussion', 'board', 'thread', 'topic', 'messageboard', 'chat')),
+    ('education', ('university', 'college', 'school', 'edu', 'academy', 'institute', 'campus', 'faculty', 'student', 'alumni')),
+    ('government', ('gov', 'government', 'municipal', 'state', 'federal', 'ministry', 'council', 'parliament', 'senate', 'congress')),
+    ('reference', ('wiki', 'encyclopedia', 'reference', 'dictionary', 'glossary', 'manual', 'howto', 'faq')),
+    ('personal', ('portfolio', 'resume', 'cv', 'bio', 'aboutme', 'profile', 'personal', 'homepage')),
+    ('software', ('software', 'app', 'download', 'tool', 'platform', 'service', 'cloud', 'saas', 'opensource')),
+    ('health', ('health', 'medical', 'clinic', 'hospital', 'doctor', 'pharmacy', 'wellness', 'care', 'medicine', 'dental', 'therapy')),
+    ('finance', ('finance', 'bank', 'money', 'loan', 'credit', 'investment', 'fund', 'insurance', 'mortgage', 'accounting', 'tax')),
+    ('travel', ('travel', 'hotel', 'flight', 'tourism', 'trip', 'tour', 'booking', 'destination', 'holiday', 'cruise', 'airline')),
+    ('food', ('restaurant', 'food', 'cafe', 'bar', 'dining', 'menu', 'cuisine', 'eatery', 'bistro', 'pub', 'grill', 'kitchen')),
+    ('sports', ('sports', 'game', 'team', 'league', 'match', 'tournament', 'score', 'athlete', 'coach', 'stadium', 'fitness', 'gym')),
+    ('arts', ('art', 'gallery', 'museum', 'exhibit', 'artist', 'painting', 'sculpture', 'theatre', 'concert', 'music', 'band', 'film', 'movie', 'cinema', 'festival')),
+    ('science', ('science', 'research', 'lab', 'technology', 'engineering', 'math', 'stem', 'physics', 'chemistry', 'biology', 'innovation')),
+    ('real_estate', ('real estate', 'property', 'housing', 'apartment', 'rent', 'home', 'condo', 'realtor', 'broker')),
+    ('jobs', ('job', 'career', 'employment', 'work', 'vacancy', 'recruit', 'hire', 'resume', 'cv')),
+    ('automotive', ('automotive', 'car', 'vehicle', 'motor', 'auto', 'garage', 'dealer', 'truck', 'bike')),
+    ('fashion', ('fashion', 'clothing', 'apparel', 'boutique', 'style', 'designer', 'shoes', 'accessory', 'jewelry')),
+    ('kids', ('kids', 'children', 'toys', 'games', 'play', 'childcare', 'nursery', 'preschool')),
+    ('environment', ('environment', 'eco', 'green', 'nature', 'wildlife', 'conservation', 'sustain', 'climate')),
+    ('religion', ('religion', 'church', 'temple', 'mosque', 'faith', 'spiritual', 'bible', 'quran', 'torah', 'worship')),
+    ('adult', ('adult', 'sex', 'porn', 'xxx', 'escort', 'dating', 'singles')),
+    ('security', ('security', 'cyber', 'privacy', 'infosec', 'hacker', 'malware', 'virus', 'firewall')),
+    ('logistics', ('logistics', 'shipping', 'delivery', 'supply', 'warehouse', 'freight', 'transport', 'cargo')),
+    ('construction', ('construction', 'builder', 'contractor', 'architecture', 'engineer', 'design', 'remodel', 'renovate')),
+    ('energy', ('energy', 'power', 'solar', 'wind', 'electric', 'utility', 'oil', 'gas', 'nuclear')),
+    ('legal', ('law', 'legal', 'attorney', 'lawyer', 'court', 'justice', 'case', 'trial', 'judge')),
+    ('consulting', ('consult', 'advisory', 'coach', 'mentor', 'counsel', 'strategy', 'management')),
+    ('events', ('event', 'conference', 'expo', 'summit', 'meetup', 'webinar', 'workshop')),
+    ('pets', ('pet', 'animal', 'vet', 'veterinary', 'dog', 'cat', 'bird', 'fish', 'horse')),
+    ('photography', ('photography', 'photo', 'camera', 'picture', 'image', 'gallery')),
+    ('language', ('translation', 'language', 'linguistics', 'dictionary', 'thesaurus', 'grammar')),
+    ('hardware', ('hardware', 'electronics', 'gadget', 'device', 'component', 'chip', 'circuit')),
+    ('hosting', ('hosting', 'server', 'domain', 'dns', 'webhost', 'cloud', 'vps')),
+    ('printing', ('printing', 'print', 'press', 'publisher', 'magazine')),
+    ('auction', ('auction', 'bid', 'bidding', 'lot', 'hammer')),
+    ('charity', ('charity', 'ngo', 'nonprofit', 'foundation', 'donate', 'volunteer')),
+    ('agriculture', ('agriculture', 'farm', 'farming', 'crop', 'harvest', 'agro', 'ranch')),
+    ('mining', ('mining', 'mine', 'miner', 'ore', 'coal', 'gold', 'silver')),
+    ('space', ('space', 'astronomy', 'planet', 'star', 'satellite', 'rocket', 'nasa')),
+    ('military', ('military', 'army', 'navy', 'airforce', 'defense', 'war', 'battle')),
+    ('transport', ('transport', 'bus', 'train', 'metro', 'subway', 'tram', 'taxi', 'cab')),
+    ('miscellaneous', ('blog', 'misc', 'other', 'general', 'info', 'site', 'web')),
+)
+_KEYWORD_CATEGORY_PAIRS = tuple((kw, cat) for cat, kws in _CATEGORY_KEYWORDS for kw in kws)
+
+# Upper bound on bytes read from a page when only its <head> is needed
+_HEAD_READ_LIMIT = 65536
+
+# Maximum number of body bytes read from a page when extracting its links
+_PAGE_READ_LIMIT = 2_000_000
+
+# External link candidates gathered per external slot, leaving spares for domains skipped later
+_EXTERNAL_CANDIDATE_FACTOR = 3
+
+# Lookup caches: entry limit and how long resolved addresses / ASN answers / robots.txt rules stay valid (seconds)
+_LOOKUP_CACHE_SIZE = 10000
+_IP_CACHE_TTL = 300
+_ASN_CACHE_TTL = 86400
+_ROBOTS_CACHE_TTL = 86400
+
+# robots.txt fetches: shorter timeout than page requests, a size cap (the limit major crawlers apply),
+# and how long an unreachable host is treated as having no rules before it is retried (seconds)
+_ROBOTS_TIMEOUT = 10
+_ROBOTS_READ_LIMIT = 512000
+_ROBOTS_ERROR_TTL = 3600
+
+# One robots.txt "directive: value" line; blank, comment-only and colon-less lines never match,
+# and trailing comments and whitespace are left out of the value
+_ROBOTS_DIRECTIVE_RE = re.compile(r'^[ \t]*([^:#\r\n]+?)[ \t]*:[ \t]*([^\r\n#]*?)[ \t]*(?:#[^\r\n]*)?\r?$', re.M)
+
+# A single DNS label: alphanumeric ends, hyphens allowed inside, at most 63 characters
+_DOMAIN_LABEL_RE = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?$')
+
+# Maximum number of main domains kept in the in-process WHOIS cache
+_WHOIS_CACHE_SIZE = 10000
+
+# Link filters used by DomainCollector._should_exclude_url
+_TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'ref', 'source', 'campaign')
+# Matches a query parameter name containing any tracking token, capturing the name
+_TRACKING_PARAM_RE = re.compile(
+    r'(?:^|&)([^=&]*(?:' + '|'.join(re.escape(p) for p in _TRACKING_PARAMS) + r')[^=&]*)',
+    re.IGNORECASE
+)
+_NON_CONTENT_PATHS = frozenset({'api', 'admin', 'assets', 'static', 'cdn', 'images', 'img', 'css', 'js'})
+_NON_CONTENT_TEXTS = frozenset({'click here', 'read more', 'learn more', 'continue', 'next', 'previous'})
+
+# Fallback WHOIS servers by TLD; anything else goes to whois.iana.org
+_WHOIS_SERVERS = {
+    '.com': 'whois.verisign-grs.com',
+    '.net': 'whois.verisign-grs.com',
+    '.org': 'whois.pir.org',
+    '.info': 'whois.afilias.net',
+    '.biz': 'whois.biz',
+    '.co': 'whois.nic.co',
+    '.io': 'whois.nic.io',
+    '.me': 'whois.nic.me',
+    '.tv': 'whois.nic.tv',
+    '.cc': 'whois.nic.cc'
+}
+
+# Fallback WHOIS response parsing
+_REGISTRAR_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Registrar:\s*(.+)',
+    r'Registrar Name:\s*(.+)',
+    r'Sponsoring Registrar:\s*(.+)'
+))
+_CREATION_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Creation Date:\s*(.+)',
+    r'Created:\s*(.+)',
+    r'Created Date:\s*(.+)'
+))
+_EXPIRY_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Registry Expiry Date:\s*(.+)',
+    r'Expiration Date:\s*(.+)',
+    r'Expires:\s*(.+)'
+))
+# Recognised WHOIS date layouts: YYYY-MM-DD (optionally followed by HH:MM:SS) and DD-Mon-YYYY
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?: \d{2}:\d{2}:\d{2})?')
+_DMY_DATE_RE = re.compile(r'\d{1,2}-[A-Za-z]{3}-\d{4}')
+
+def _parse_date(date_str):
+    """Parse a WHOIS date string into a date, or None if no known format matches"""
+    date_str = date_str.strip()
+    try:
+        match = _ISO_DATE_RE.fullmatch(date_str)
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if _DMY_DATE_RE.fullmatch(date_str):
+            return datetime.strptime(date_str, '%d-%b-%Y').date()
+    except ValueError:
+        pass
+    return None
+
+# Public Suffix List lookups use the snapshot bundled with tldextract (no network fetch)
+_tld_extract = tldextract.TLDExtract(suffix_list_urls=())
+
+# Only <a href> elements are built when parsing pages for links
+_ANCHOR_STRAINER = SoupStrainer('a', href=True)
+
+@lru_cache(maxsize=4096)
+def _registrable_domain(domain_name):
+    """Return the registrable domain, e.g. blog.example.co.uk -> example.co.uk"""
+    ext = _tld_extract(domain_name)
+    if ext.domain and ext.suffix:
+        return f"{ext.domain}.{ext.suffix}"
+    return domain_name
+
+@lru_cache(maxsize=4096)
+def _strip_www(netloc):
+    """Lowercase a netloc and drop a leading www."""
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
 class DomainCollector:
+    # chromedriver binary path, resolved by webdriver_manager on first screenshot
+    _chromedriver_path = None
+    
     def __init__(self):
         """Initialize the domain collector"""
-        import os
-        import socket
-        
         # Generate a unique process identifier
         self.process_id = f"{socket.gethostname()}-{os.getpid()}"
         
@@ -50,27 +217,73 @@ class DomainCollector:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        # Keep-alive pools large enough for the concurrent probe/lookup threads across many hosts
+        adapter = HTTPAdapter(pool_connections=256, pool_maxsize=256)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Shared DNS resolver with an in-process answer cache
+        self.dns_resolver = dns.resolver.Resolver()
+        self.dns_resolver.cache = dns.resolver.LRUCache(max_size=_LOOKUP_CACHE_SIZE)
+        self.dns_resolver.timeout = 2.0
+        self.dns_resolver.lifetime = 3.0
         
-        # Initialize geolocator
+        # Thread pool for concurrent redirect-detection HEAD requests
+        self._probe_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='probe')
+        
+        # Short-lived caches for resolved addresses and ipinfo ASN answers, shared with the lookup pool
+        self._ip_cache = {}
+        self._asn_cache = {}
+        self._robots_cache = {}
+        self._robots_error_cache = {}
+        self._host_last_visit = {}  # domain_name -> monotonic time of last visit, oldest first
+        self._cache_lock = threading.Lock()
+        
+        # Small thread pool for overlapping independent network lookups
+        self._lookup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='lookup')
+        
+        # Thread pool running the per-domain WHOIS / DNS / SSL / geolocation collectors side by side
+        self._collect_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='collect')
+        
+        # Main-domain WHOIS data (created_date, expiry_date, registrar) reused for subdomains
+        self._whois_cache = {}
+        
+        # Headless Chrome driver for screenshots, started on first use and reused
+        self._driver = None
+        self._driver_lock = threading.Lock()
+        
+        # Initialize URL filters
+        self._init_url_filters()
+    
+    @cached_property
+    def geolocator(self):
+        """Nominatim geolocator, created on first use"""
         try:
             nominatim_url = DATA_CONFIG.get('nominatim_url')
             if nominatim_url:
-                self.geolocator = Nominatim(user_agent=COLLECTION_CONFIG['http_user_agent'], domain=nominatim_url)
-            else:
-                self.geolocator = Nominatim(user_agent=COLLECTION_CONFIG['http_user_agent'])
+                return Nominatim(user_agent=COLLECTION_CONFIG['http_user_agent'], domain=nominatim_url)
+            return Nominatim(user_agent=COLLECTION_CONFIG['http_user_agent'])
         except Exception as e:
             logger.warning(f"Failed to initialize geolocator: {e}")
-            self.geolocator = None
-        
-        # Initialize MaxMind GeoIP2/GeoLite2 reader
+            return None
+    
+    @cached_property
+    def maxmind_reader(self):
+        """MaxMind GeoIP2/GeoLite2 reader, opened on first geolocation lookup"""
         try:
-            self.maxmind_reader = geoip2.database.Reader(DATA_CONFIG['maxmind_db_path'])
+            return geoip2.database.Reader(DATA_CONFIG['maxmind_db_path'])
         except Exception as e:
             logger.warning(f'Failed to initialize MaxMind GeoIP2: {e}')
-            self.maxmind_reader = None
-        
-        # Initialize URL filters
-        self._init_url_filters()
+            return None
+    
+    @cached_property
+    def maxmind_asn_reader(self):
+        """MaxMind GeoLite2 ASN reader, opened on first ASN lookup (None if the database is not installed)"""
+        try:
+            return geoip2.database.Reader(DATA_CONFIG['maxmind_asn_db_path'])
+        except Exception as e:
+            logger.info(f'MaxMind ASN database not available, using ipinfo.io for ASN lookups: {e}')
+            return None
     
     def _init_url_filters(self):
         """Initialize URL filtering patterns"""
@@ -120,8 +333,21 @@ class DomainCollector:
             r'^[^.]+\.itch\.io$', r'^[^.]+\.github\.io$',r'^[^.]+\.wordpress\.com$',
         ]
         
-        # Compile regex patterns
-        self.excluded_regex = [re.compile(pattern, re.IGNORECASE) for pattern in self.excluded_patterns]
+        # Compile all patterns into one alternation; each is wrapped in a numbered group so the
+        # pattern that matched can still be reported
+        self.excluded_regex = re.compile(
+            '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(self.excluded_patterns)),
+            re.IGNORECASE
+        )
+        # Same set as a tuple for a single str.endswith() check
+        self.excluded_extensions_tuple = tuple(self.excluded_extensions)
+    
+    def _match_excluded_pattern(self, text):
+        """Return the excluded pattern found in text, or None"""
+        match = self.excluded_regex.search(text)
+        if match:
+            return self.excluded_patterns[int(match.lastgroup[1:])]
+        return None
     
     def _should_exclude_domain(self, domain_name):
         """Check if domain should be excluded based on domain patterns"""
@@ -130,10 +356,9 @@ class DomainCollector:
                 return True, "No domain name"
             
             # Check for excluded domain patterns
-            domain_lower = domain_name.lower()
-            for pattern in self.excluded_regex:
-                if pattern.search(domain_lower):
-                    return True, f"Excluded domain pattern: {pattern.pattern}"
+            pattern = self._match_excluded_pattern(domain_name.lower())
+            if pattern:
+                return True, f"Excluded domain pattern: {pattern}"
             
             return False, None
             
@@ -141,10 +366,11 @@ class DomainCollector:
             logger.warning(f"Error checking domain exclusion: {e}")
             return True, f"Error checking domain: {e}"
 
-    def _should_exclude_url(self, url, link_text):
+    def _should_exclude_url(self, url, link_text, parsed_url=None):
         """Check if URL should be excluded based on various criteria"""
         try:
-            parsed_url = urlparse(url)
+            if parsed_url is None:
+                parsed_url = urlparse(url)
             
             # Skip if no netloc (relative links, javascript, etc.)
             if not parsed_url.netloc:
@@ -152,27 +378,24 @@ class DomainCollector:
             
             # Check for excluded file extensions
             path = parsed_url.path.lower()
-            for ext in self.excluded_extensions:
-                if path.endswith(ext):
-                    return True, f"Excluded extension: {ext}"
+            if path.endswith(self.excluded_extensions_tuple):
+                ext = next(ext for ext in self.excluded_extensions_tuple if path.endswith(ext))
+                return True, f"Excluded extension: {ext}"
             
             # Check for excluded patterns
-            full_url = url.lower()
-            for pattern in self.excluded_regex:
-                if pattern.search(full_url):
-                    return True, f"Excluded pattern: {pattern.pattern}"
+            pattern = self._match_excluded_pattern(url.lower())
+            if pattern:
+                return True, f"Excluded pattern: {pattern}"
             
             # Skip URLs with excessive parameters (likely tracking)
             if parsed_url.query:
-                query_params = parse_qs(parsed_url.query)
-                if len(query_params) > 10:  # Too many parameters
+                if parsed_url.query.count('&') + 1 > 10:  # Too many parameters
                     return True, "Too many query parameters"
                 
                 # Check for common tracking parameters
-                tracking_params = ['utm_', 'fbclid', 'gclid', 'ref', 'source', 'campaign']
-                for param in query_params.keys():
-                    if any(tracking in param.lower() for tracking in tracking_params):
-                        return True, f"Tracking parameter: {param}"
+                match = _TRACKING_PARAM_RE.search(parsed_url.query)
+                if match:
+                    return True, f"Tracking parameter: {match.group(1)}"
             
             # Skip very long URLs (likely generated)
             if len(url) > 500:
@@ -186,8 +409,7 @@ class DomainCollector:
             # Skip URLs with common non-content paths
             if path_segments:
                 first_segment = path_segments[0].lower()
-                non_content_paths = ['api', 'admin', 'assets', 'static', 'cdn', 'images', 'img', 'css', 'js']
-                if first_segment in non_content_paths:
+                if first_segment in _NON_CONTENT_PATHS:
                     return True, f"Non-content path: {first_segment}"
             
             # Skip empty or very short link text (likely not meaningful)
@@ -195,8 +417,7 @@ class DomainCollector:
                 return True, "Empty or very short link text"
             
             # Skip common non-content link texts
-            non_content_texts = ['click here', 'read more', 'learn more', 'continue', 'next', 'previous']
-            if link_text.lower().strip() in non_content_texts:
+            if link_text.lower().strip() in _NON_CONTENT_TEXTS:
                 return True, f"Non-content link text: {link_text}"
             
             return False, None
@@ -205,10 +426,11 @@ class DomainCollector:
             logger.warning(f"Error checking URL exclusion: {e}")
             return True, f"Error checking URL: {e}"
     
-    def _clean_url_for_queue(self, url):
+    def _clean_url_for_queue(self, url, parsed_url=None):
         """Clean URL by removing parameters and fragments for queue processing"""
         try:
-            parsed_url = urlparse(url)
+            if parsed_url is None:
+                parsed_url = urlparse(url)
             
             # Remove query parameters and fragments
             clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
@@ -225,22 +447,39 @@ class DomainCollector:
     
     def _get_main_domain(self, domain_name):
         """Extract the main domain for WHOIS queries (remove subdomains)"""
-        parts = domain_name.split('.')
-        if len(parts) > 2:
-            # For domains like blog.theravenhub.com, return theravenhub.com
-            return '.'.join(parts[-2:])
-        return domain_name
+        return _registrable_domain(domain_name)
+    
+    def _cache_whois(self, domain_name, whois_data):
+        """Remember main-domain WHOIS data, evicting the oldest entry once the cache is full"""
+        if len(self._whois_cache) >= _WHOIS_CACHE_SIZE:
+            self._whois_cache.pop(next(iter(self._whois_cache)))
+        self._whois_cache[domain_name.lower()] = whois_data
     
     def _is_allowed_to_scrape(self, domain_name, path='/'):
         """Check if scraping is allowed for the given domain and path using robots.txt logic."""
         return self._check_robots_txt(domain_name, path)
     
-    def collect_domain_data(self, domain_name, depth=0, url=None, shutdown_check=None, write_discoveries=True):
-        """Collect comprehensive data for a domain"""
+    def collect_domain_data(self, domain_name, depth=0, url=None, shutdown_check=None, write_discoveries=True, deadline=None,
+                            discovery_sink=None):
+        """Collect comprehensive data for a domain (deadline: optional time.monotonic() value after which TimeoutError is raised;
+        discovery_sink: optional list that receives the discovered URLs instead of them being queued here)"""
         start_time = time.time()
         # Ensure url is always defined
         if url is None:
             url = f"http://{domain_name}"
+        
+        def remaining_time():
+            return None if deadline is None else max(0, deadline - time.monotonic())
+        
+        def check_deadline(stage):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Collection for {domain_name} exceeded its deadline {stage}")
+        
+        # Relationship collection stops early at the deadline as it would on shutdown
+        stop_check = shutdown_check
+        if deadline is not None:
+            stop_check = lambda: (shutdown_check is not None and shutdown_check()) or time.monotonic() >= deadline
+        
         try:
             # Check for shutdown at the start
             if shutdown_check and shutdown_check():
@@ -265,10 +504,13 @@ class DomainCollector:
                     return domain_id, []
                 
                 # Still collect relationships and discover URLs
-                relationships, discovered_urls = self._collect_relationships_and_discover(domain_name, domain_id, shutdown_check)
+                relationships, discovered_urls = self._collect_relationships_and_discover(domain_name, domain_id, stop_check)
+                check_deadline("while collecting relationships")
                 
-                # Add discovered URLs to queue for future processing
-                if write_discoveries and discovered_urls:
+                # Add discovered URLs to queue for future processing, or hand them to the caller
+                if discovery_sink is not None:
+                    discovery_sink.extend(discovered_url._replace(depth=depth + 1) for discovered_url in discovered_urls)
+                elif write_discoveries and discovered_urls:
                     self.add_discovered_urls_to_queue(discovered_urls, depth + 1)
                 
                 processing_time = time.time() - start_time
@@ -314,114 +556,23 @@ class DomainCollector:
             # Collect basic web data
             web_data = self._collect_web_data(domain_name)
             domain_data.update(web_data)
+            check_deadline("after web data")
 
             # --- Simple Category and Tags Logic ---
             title = web_data.get('title', '') or ''
             description = web_data.get('description', '') or ''
-            category = None
             tags = set()
 
             # Heuristic for category (expanded)
             lowered = f"{title} {description} {domain_name}".lower()
-            if 'blog' in lowered or 'post' in lowered or 'journal' in lowered:
-                category = 'blog'
-            elif any(word in lowered for word in ['shop', 'store', 'buy', 'ecommerce', 'cart', 'product', 'sale', 'deal', 'outlet', 'retail', 'market']):
-                category = 'ecommerce'
-            elif any(word in lowered for word in ['news', 'media', 'press', 'magazine', 'gazette', 'bulletin', 'headline', 'reporter', 'newspaper']):
-                category = 'news'
-            elif any(word in lowered for word in ['forum', 'community', 'discussion', 'board', 'thread', 'topic', 'messageboard', 'chat']):
-                category = 'forum'
-            elif any(word in lowered for word in ['university', 'college', 'school', 'edu', 'academy', 'institute', 'campus', 'faculty', 'student', 'alumni']):
-                category = 'education'
-            elif any(word in lowered for word in ['gov', 'government', 'municipal', 'state', 'federal', 'ministry', 'council', 'parliament', 'senate', 'congress']):
-                category = 'government'
-            elif any(word in lowered for word in ['wiki', 'encyclopedia', 'reference', 'dictionary', 'glossary', 'manual', 'howto', 'faq']):
-                category = 'reference'
-            elif any(word in lowered for word in ['portfolio', 'resume', 'cv', 'bio', 'aboutme', 'profile', 'personal', 'homepage']):
-                category = 'personal'
-            elif any(word in lowered for word in ['software', 'app', 'download', 'tool', 'platform', 'service', 'cloud', 'saas', 'opensource']):
-                category = 'software'
-            elif any(word in lowered for word in ['health', 'medical', 'clinic', 'hospital', 'doctor', 'pharmacy', 'wellness', 'care', 'medicine', 'dental', 'therapy']):
-                category = 'health'
-            elif any(word in lowered for word in ['finance', 'bank', 'money', 'loan', 'credit', 'investment', 'fund', 'insurance', 'mortgage', 'accounting', 'tax']):
-                category = 'finance'
-            elif any(word in lowered for word in ['travel', 'hotel', 'flight', 'tourism', 'trip', 'tour', 'booking', 'destination', 'holiday', 'cruise', 'airline']):
-                category = 'travel'
-            elif any(word in lowered for word in ['restaurant', 'food', 'cafe', 'bar', 'dining', 'menu', 'cuisine', 'eatery', 'bistro', 'pub', 'grill', 'kitchen']):
-                category = 'food'
-            elif any(word in lowered for word in ['sports', 'game', 'team', 'league', 'match', 'tournament', 'score', 'athlete', 'coach', 'stadium', 'fitness', 'gym']):
-                category = 'sports'
-            elif any(word in lowered for word in ['art', 'gallery', 'museum', 'exhibit', 'artist', 'painting', 'sculpture', 'theatre', 'concert', 'music', 'band', 'film', 'movie', 'cinema', 'festival']):
-                category = 'arts'
-            elif any(word in lowered for word in ['science', 'research', 'lab', 'technology', 'engineering', 'math', 'stem', 'physics', 'chemistry', 'biology', 'innovation']):
-                category = 'science'
-            elif any(word in lowered for word in ['real estate', 'property', 'housing', 'apartment', 'rent', 'home', 'condo', 'realtor', 'broker']):
-                category = 'real_estate'
-            elif any(word in lowered for word in ['job', 'career', 'employment', 'work', 'vacancy', 'recruit', 'hire', 'resume', 'cv']):
-                category = 'jobs'
-            elif any(word in lowered for word in ['automotive', 'car', 'vehicle', 'motor', 'auto', 'garage', 'dealer', 'truck', 'bike']):
-                category = 'automotive'
-            elif any(word in lowered for word in ['fashion', 'clothing', 'apparel', 'boutique', 'style', 'designer', 'shoes', 'accessory', 'jewelry']):
-                category = 'fashion'
-            elif any(word in lowered for word in ['kids', 'children', 'toys', 'games', 'play', 'childcare', 'nursery', 'preschool']):
-                category = 'kids'
-            elif any(word in lowered for word in ['environment', 'eco', 'green', 'nature', 'wildlife', 'conservation', 'sustain', 'climate']):
-                category = 'environment'
-            elif any(word in lowered for word in ['religion', 'church', 'temple', 'mosque', 'faith', 'spiritual', 'bible', 'quran', 'torah', 'worship']):
-                category = 'religion'
-            elif any(word in lowered for word in ['adult', 'sex', 'porn', 'xxx', 'escort', 'dating', 'singles']):
-                category = 'adult'
-            elif any(word in lowered for word in ['security', 'cyber', 'privacy', 'infosec', 'hacker', 'malware', 'virus', 'firewall']):
-                category = 'security'
-            elif any(word in lowered for word in ['logistics', 'shipping', 'delivery', 'supply', 'warehouse', 'freight', 'transport', 'cargo']):
-                category = 'logistics'
-            elif any(word in lowered for word in ['construction', 'builder', 'contractor', 'architecture', 'engineer', 'design', 'remodel', 'renovate']):
-                category = 'construction'
-            elif any(word in lowered for word in ['energy', 'power', 'solar', 'wind', 'electric', 'utility', 'oil', 'gas', 'nuclear']):
-                category = 'energy'
-            elif any(word in lowered for word in ['law', 'legal', 'attorney', 'lawyer', 'court', 'justice', 'case', 'trial', 'judge']):
-                category = 'legal'
-            elif any(word in lowered for word in ['consult', 'advisory', 'coach', 'mentor', 'counsel', 'strategy', 'management']):
-                category = 'consulting'
-            elif any(word in lowered for word in ['event', 'conference', 'expo', 'summit', 'meetup', 'webinar', 'workshop']):
-                category = 'events'
-            elif any(word in lowered for word in ['pet', 'animal', 'vet', 'veterinary', 'dog', 'cat', 'bird', 'fish', 'horse']):
-                category = 'pets'
-            elif any(word in lowered for word in ['photography', 'photo', 'camera', 'picture', 'image', 'gallery']):
-                category = 'photography'
-            elif any(word in lowered for word in ['translation', 'language', 'linguistics', 'dictionary', 'thesaurus', 'grammar']):
-                category = 'language'
-            elif any(word in lowered for word in ['hardware', 'electronics', 'gadget', 'device', 'component', 'chip', 'circuit']):
-                category = 'hardware'
-            elif any(word in lowered for word in ['hosting', 'server', 'domain', 'dns', 'webhost', 'cloud', 'vps']):
-                category = 'hosting'
-            elif any(word in lowered for word in ['printing', 'print', 'press', 'publisher', 'magazine']):
-                category = 'printing'
-            elif any(word in lowered for word in ['auction', 'bid', 'bidding', 'lot', 'hammer']):
-                category = 'auction'
-            elif any(word in lowered for word in ['charity', 'ngo', 'nonprofit', 'foundation', 'donate', 'volunteer']):
-                category = 'charity'
-            elif any(word in lowered for word in ['agriculture', 'farm', 'farming', 'crop', 'harvest', 'agro', 'ranch']):
-                category = 'agriculture'
-            elif any(word in lowered for word in ['mining', 'mine', 'miner', 'ore', 'coal', 'gold', 'silver']):
-                category = 'mining'
-            elif any(word in lowered for word in ['space', 'astronomy', 'planet', 'star', 'satellite', 'rocket', 'nasa']):
-                category = 'space'
-            elif any(word in lowered for word in ['military', 'army', 'navy', 'airforce', 'defense', 'war', 'battle']):
-                category = 'military'
-            elif any(word in lowered for word in ['transport', 'bus', 'train', 'metro', 'subway', 'tram', 'taxi', 'cab']):
-                category = 'transport'
-            elif any(word in lowered for word in ['blog', 'misc', 'other', 'general', 'info', 'site', 'web']):
-                category = 'miscellaneous'
-            if not category:
-                category = 'miscellaneous'
+            category = next((cat for kw, cat in _KEYWORD_CATEGORY_PAIRS if kw in lowered), 'miscellaneous')
 
             # Extract meta keywords for tags
             meta_keywords = ''
             try:
                 url = f"http://{domain_name}"
-                response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'])
-                soup = BeautifulSoup(response.content, 'html.parser')
+                response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'], stream=True)
+                soup = BeautifulSoup(self._read_head_content(response), 'html.parser')
                 meta_tag = soup.find('meta', attrs={'name': 'keywords'})
                 if meta_tag and isinstance(meta_tag, Tag):
                     content = meta_tag.get('content')
@@ -450,51 +601,71 @@ class DomainCollector:
             domain_data['category'] = category
             domain_data['tags'] = ','.join(sorted(tags)) if tags else None
             
+            # Resolve the address once and share it between the DNS/ASN, SSL and geolocation steps
+            try:
+                ip_address = self._resolve_ip(domain_name)
+            except Exception:
+                ip_address = None
+            
+            # Run the WHOIS, DNS/ASN, SSL and geolocation lookups concurrently; they touch
+            # disjoint fields and never the database, so results are merged here in order
+            main_domain = self._get_main_domain(domain_name)
+            whois_future = None
+            if DATA_CONFIG['collect_whois'] and main_domain == domain_name:  # Only query WHOIS for main domains
+                whois_future = self._collect_pool.submit(self._collect_whois_data, domain_name)
+            lookup_futures = [self._collect_pool.submit(self._collect_dns_data, domain_name, ip_address)]
+            if DATA_CONFIG['collect_ssl']:
+                lookup_futures.append(self._collect_pool.submit(self._collect_ssl_data, domain_name, ip_address))
+            if DATA_CONFIG['collect_geolocation']:
+                lookup_futures.append(self._collect_pool.submit(self._collect_geolocation_data, domain_name, ip_address))
+            
             # Collect WHOIS data (only for main domains, not subdomains)
             if DATA_CONFIG['collect_whois']:
-                main_domain = self._get_main_domain(domain_name)
-                if main_domain == domain_name:  # Only query WHOIS for main domains
-                    whois_data = self._collect_whois_data(domain_name)
+                if whois_future:
+                    whois_data = whois_future.result(timeout=remaining_time())
                     domain_data.update(whois_data)
+                    if whois_data:
+                        self._cache_whois(domain_name, {
+                            'created_date': whois_data.get('created_date'),
+                            'expiry_date': whois_data.get('expiry_date'),
+                            'registrar': whois_data.get('registrar')
+                        })
                 else:
                     logger.info(f"Skipping WHOIS for subdomain {domain_name}, using main domain {main_domain}")
-                    # Try to get WHOIS data from main domain
-                    main_domain_id = self.db.get_domain_id(main_domain)
-                    if main_domain_id:
-                        # Copy WHOIS data from main domain
+                    # Try to get WHOIS data from main domain, reading the database only on a cache miss
+                    main_data = self._whois_cache.get(main_domain.lower())
+                    if main_data is None:
                         cursor = self.db.connection.cursor(dictionary=True)
-                        cursor.execute("""
-                            SELECT created_date, expiry_date, registrar
-                            FROM domains 
-                            WHERE domain_name = %s
-                        """, (main_domain,))
-                        main_data = cursor.fetchone()
+                        try:
+                            cursor.execute("""
+                                SELECT created_date, expiry_date, registrar
+                                FROM domains 
+                                WHERE domain_name = %s
+                            """, (main_domain,))
+                            main_data = cursor.fetchone()
+                        finally:
+                            cursor.close()
                         if main_data:
-                            domain_data.update({
-                                'created_date': main_data['created_date'],
-                                'expiry_date': main_data['expiry_date'],
-                                'registrar': main_data['registrar']
-                            })
-                        cursor.close()
+                            self._cache_whois(main_domain, main_data)
+                    if main_data:
+                        # Copy WHOIS data from main domain
+                        domain_data.update({
+                            'created_date': main_data['created_date'],
+                            'expiry_date': main_data['expiry_date'],
+                            'registrar': main_data['registrar']
+                        })
             
             # Check for shutdown after WHOIS collection
             if shutdown_check and shutdown_check():
                 logger.info("Shutdown requested after WHOIS collection")
+                for future in lookup_futures:
+                    future.cancel()
                 return None, []
             
-            # Collect DNS and ASN data
-            dns_data = self._collect_dns_data(domain_name)
-            domain_data.update(dns_data)
-            
-            # Collect SSL certificate data
-            if DATA_CONFIG['collect_ssl']:
-                ssl_data = self._collect_ssl_data(domain_name)
-                domain_data.update(ssl_data)
-            
-            # Collect geolocation data
-            if DATA_CONFIG['collect_geolocation']:
-                geo_data = self._collect_geolocation_data(domain_name)
-                domain_data.update(geo_data)
+            # Merge DNS/ASN, SSL certificate and geolocation data
+            for future in lookup_futures:
+                domain_data.update(future.result(timeout=remaining_time()))
+            check_deadline("after lookups")
             
             # Collect screenshot
             if DATA_CONFIG['collect_screenshots']:
@@ -515,10 +686,13 @@ class DomainCollector:
                 return None, []
             
             # Collect relationships and discover new URLs
-            relationships, discovered_urls = self._collect_relationships_and_discover(domain_name, domain_id, shutdown_check)
+            relationships, discovered_urls = self._collect_relationships_and_discover(domain_name, domain_id, stop_check)
+            check_deadline("while collecting relationships")
             
-            # Add discovered URLs to queue for future processing
-            if write_discoveries and discovered_urls:
+            # Add discovered URLs to queue for future processing, or hand them to the caller
+            if discovery_sink is not None:
+                discovery_sink.extend(discovered_url._replace(depth=depth + 1) for discovered_url in discovered_urls)
+            elif write_discoveries and discovered_urls:
                 self.add_discovered_urls_to_queue(discovered_urls, depth + 1)
             
             processing_time = time.time() - start_time
@@ -557,10 +731,14 @@ class DomainCollector:
                 return {}
             
             url = f"http://{domain_name}"
-            response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'])
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'], stream=True)
+            try:
+                response.raise_for_status()
+                # Title, description and favicon all live in <head>, so stop reading after it
+                head_content = self._read_head_content(response)
+            finally:
+                response.close()
+            soup = BeautifulSoup(head_content, 'html.parser')
             
             data = {}
             
@@ -590,6 +768,19 @@ class DomainCollector:
             logger.warning(f"Error collecting web data for {domain_name}: {e}")
             return {}
     
+    def _read_head_content(self, response, max_bytes=_HEAD_READ_LIMIT):
+        """Read a streamed response until </head> is seen or max_bytes is reached, then close it"""
+        buf = bytearray()
+        try:
+            for chunk in response.iter_content(8192):
+                buf += chunk
+                # Look at the newly read chunk plus enough overlap to catch a tag split across chunks
+                if b'</head>' in buf[-(len(chunk) + 6):].lower() or len(buf) >= max_bytes:
+                    break
+        finally:
+            response.close()
+        return bytes(buf)
+    
     def _collect_whois_data(self, domain_name):
         """Collect WHOIS data"""
         try:
@@ -626,128 +817,73 @@ class DomainCollector:
     def _collect_whois_fallback(self, domain_name):
         """Fallback WHOIS collection using socket connection"""
         try:
-            import socket
-            
-            # Common WHOIS servers
-            whois_servers = {
-                '.com': 'whois.verisign-grs.com',
-                '.net': 'whois.verisign-grs.com',
-                '.org': 'whois.pir.org',
-                '.info': 'whois.afilias.net',
-                '.biz': 'whois.biz',
-                '.co': 'whois.nic.co',
-                '.io': 'whois.nic.io',
-                '.me': 'whois.nic.me',
-                '.tv': 'whois.nic.tv',
-                '.cc': 'whois.nic.cc'
-            }
-            
             # Determine WHOIS server based on TLD
             tld = '.' + domain_name.split('.')[-1]
-            whois_server = whois_servers.get(tld, 'whois.iana.org')
-            
-            # Connect to WHOIS server
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)
-            sock.connect((whois_server, 43))
-            
-            # Send query
-            query = domain_name + '\r\n'
-            sock.send(query.encode())
-            
-            # Receive response
-            response = b''
-            while True:
-                data = sock.recv(4096)
-                if not data:
-                    break
-                response += data
+            whois_server = _WHOIS_SERVERS.get(tld, 'whois.iana.org')
             
-            sock.close()
-            
-            # Parse response
-            whois_text = response.decode('utf-8', errors='ignore')
-            data = {}
-            
-            # Extract registrar
-            registrar_patterns = [
-                r'Registrar:\s*(.+)',
-                r'Registrar Name:\s*(.+)',
-                r'Sponsoring Registrar:\s*(.+)'
-            ]
-            
-            for pattern in registrar_patterns:
-                match = re.search(pattern, whois_text, re.IGNORECASE)
-                if match:
-                    data['registrar'] = match.group(1).strip()
-                    break
-            
-            # Extract creation date
-            creation_patterns = [
-                r'Creation Date:\s*(.+)',
-                r'Created:\s*(.+)',
-                r'Created Date:\s*(.+)'
-            ]
-            
-            for pattern in creation_patterns:
-                match = re.search(pattern, whois_text, re.IGNORECASE)
-                if match:
-                    try:
-                        date_val = match.group(1)
-                        if isinstance(date_val, str):
-                            date_str = date_val.strip()
-                            # Try to parse various date formats
-                            for fmt in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%b-%Y']:
-                                try:
-                                    data['created_date'] = datetime.strptime(date_str, fmt).date()
-                                    break
-                                except ValueError:
-                                    continue
-                    except Exception:
-                        pass
-                    break
-            
-            # Extract expiry date
-            expiry_patterns = [
-                r'Registry Expiry Date:\s*(.+)',
-                r'Expiration Date:\s*(.+)',
-                r'Expires:\s*(.+)'
-            ]
-            
-            for pattern in expiry_patterns:
-                match = re.search(pattern, whois_text, re.IGNORECASE)
-                if match:
-                    try:
-                        date_val = match.group(1)
-                        if isinstance(date_val, str):
-                            date_str = date_val.strip()
-                            # Try to parse various date formats
-                            for fmt in ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d-%b-%Y']:
-                                try:
-                                    data['expiry_date'] = datetime.strptime(date_str, fmt).date()
-                                    break
-                                except ValueError:
-                                    continue
-                    except Exception:
-                        pass
-                    break
+            # Connect to WHOIS server (create_connection also handles IPv6-only servers)
+            with socket.create_connection((whois_server, 43), timeout=10) as sock:
+                # Send query
+                sock.sendall((domain_name + '\r\n').encode())
+                
+                # Receive response
+                response = bytearray()
+                while True:
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    response.extend(data)
             
-            return data
+            return self._parse_whois_response(response.decode('utf-8', errors='ignore'))
             
         except Exception as e:
             logger.warning(f"Fallback WHOIS also failed for {domain_name}: {e}")
             return {}
     
-    def _collect_dns_data(self, domain_name):
-        """Collect DNS and ASN data"""
+    def _parse_whois_response(self, whois_text):
+        """Extract registrar, creation and expiry dates from a raw WHOIS response"""
+        data = {}
+        
+        # Extract registrar
+        for rx in _REGISTRAR_RES:
+            match = rx.search(whois_text)
+            if match:
+                data['registrar'] = match.group(1).strip()
+                break
+        
+        # Extract creation date
+        for rx in _CREATION_RES:
+            match = rx.search(whois_text)
+            if match:
+                created_date = _parse_date(match.group(1))
+                if created_date:
+                    data['created_date'] = created_date
+                break
+        
+        # Extract expiry date
+        for rx in _EXPIRY_RES:
+            match = rx.search(whois_text)
+            if match:
+                expiry_date = _parse_date(match.group(1))
+                if expiry_date:
+                    data['expiry_date'] = expiry_date
+                break
+        
+        return data
+    
+    def _collect_dns_data(self, domain_name, ip_address=None):
+        """Collect DNS and ASN data (ip_address skips re-resolving the domain if already known)"""
         try:
             data = {}
             
+            # Resolve the address and look up its ASN while the NS query is in flight
+            asn_future = self._lookup_pool.submit(self._collect_asn_data, domain_name, ip_address)
+            
             # Get nameservers with better error handling
             try:
                 # First try to get nameservers for the domain itself
-                nameservers = dns.resolver.resolve(domain_name, 'NS')
-                data['nameservers'] = json.dumps([str(ns) for ns in nameservers])
+                nameservers = self.dns_resolver.resolve(domain_name, 'NS')
+                data['nameservers'] = [str(ns).rstrip('.') for ns in nameservers]
                 logger.info(f"Found nameservers for {domain_name}: {data['nameservers']}")
                     
             except dns.resolver.NXDOMAIN:
@@ -759,8 +895,8 @@ class DomainCollector:
                 if main_domain != domain_name:
                     try:
                         logger.info(f"No NS records for {domain_name}, trying parent domain {main_domain}")
-                        nameservers = dns.resolver.resolve(main_domain, 'NS')
-                        data['nameservers'] = json.dumps([str(ns) for ns in nameservers])
+                        nameservers = self.dns_resolver.resolve(main_domain, 'NS')
+                        data['nameservers'] = [str(ns).rstrip('.') for ns in nameservers]
                         logger.info(f"Found nameservers from parent domain {main_domain}: {data['nameservers']}")
                     except Exception as parent_e:
                         logger.warning(f"Error getting nameservers from parent domain {main_domain}: {parent_e}")
@@ -776,20 +912,7 @@ class DomainCollector:
                 data['nameservers'] = None
             
             # Get ASN information
-            try:
-                # Get IP address first
-                ip_address = socket.gethostbyname(domain_name)
-                
-                # Use external service to get ASN info
-                asn_data = self._get_asn_info(ip_address)
-                if asn_data:
-                    data['asn'] = asn_data.get('asn')
-                    data['asn_description'] = asn_data.get('description')
-                
-            except socket.gaierror:
-                logger.warning(f"Could not resolve IP address for {domain_name}")
-            except Exception as e:
-                logger.warning(f"Error getting ASN data for {domain_name}: {e}")
+            data.update(asn_future.result())
             
             return data
             
@@ -797,27 +920,97 @@ class DomainCollector:
             logger.warning(f"Error collecting DNS data for {domain_name}: {e}")
             return {}
     
+    def _collect_asn_data(self, domain_name, ip_address=None):
+        """Resolve the domain's IP address (unless given) and collect its ASN data"""
+        data = {}
+        try:
+            # Get IP address first
+            if not ip_address:
+                ip_address = self._resolve_ip(domain_name)
+            
+            # Use external service to get ASN info
+            asn_data = self._get_asn_info(ip_address)
+            if asn_data:
+                data['asn'] = asn_data.get('asn')
+                data['asn_description'] = asn_data.get('description')
+            
+        except socket.gaierror:
+            logger.warning(f"Could not resolve IP address for {domain_name}")
+        except Exception as e:
+            logger.warning(f"Error getting ASN data for {domain_name}: {e}")
+        
+        return data
+    
+    def _cache_get(self, cache, key, ttl):
+        """Return a cached value if present and younger than ttl seconds, else None"""
+        with self._cache_lock:
+            entry = cache.get(key)
+        if entry and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+        return None
+    
+    def _cache_put(self, cache, key, value):
+        """Store a value with its timestamp, evicting the oldest entry once the cache is full"""
+        with self._cache_lock:
+            if len(cache) >= _LOOKUP_CACHE_SIZE and key not in cache:
+                cache.pop(next(iter(cache)))
+            cache[key] = (value, time.monotonic())
+    
+    def _resolve_ip(self, domain_name):
+        """Resolve a domain to an IPv4 address, reusing recent answers"""
+        ip_address = self._cache_get(self._ip_cache, domain_name, _IP_CACHE_TTL)
+        if ip_address is None:
+            ip_address = socket.gethostbyname(domain_name)
+            self._cache_put(self._ip_cache, domain_name, ip_address)
+        return ip_address
+    
     def _get_asn_info(self, ip_address):
         """Get ASN information for an IP address"""
+        # Many domains share hosting/CDN addresses, so each IP is only looked up once per TTL
+        cached = self._cache_get(self._asn_cache, ip_address, _ASN_CACHE_TTL)
+        if cached is not None:
+            return cached
+        # Local MaxMind database first; same "AS<number> <organization>" shape as ipinfo's org field
+        if self.maxmind_asn_reader:
+            try:
+                response = self.maxmind_asn_reader.asn(ip_address)
+                if response.autonomous_system_number:
+                    asn = f"AS{response.autonomous_system_number}"
+                    asn_info = {
+                        'asn': asn,
+                        'description': f"{asn} {response.autonomous_system_organization}" if response.autonomous_system_organization else asn
+                    }
+                    self._cache_put(self._asn_cache, ip_address, asn_info)
+                    return asn_info
+            except Exception as e:
+                logger.debug(f"MaxMind ASN lookup failed for {ip_address}: {e}")
         try:
             # Using ipinfo.io API (free tier available)
             response = self.session.get(f"https://ipinfo.io/{ip_address}/json", timeout=10)
             if response.status_code == 200:
                 data = response.json()
-                return {
+                asn_info = {
                     'asn': data.get('org', '').split()[0] if data.get('org') else None,
                     'description': data.get('org')
                 }
+                self._cache_put(self._asn_cache, ip_address, asn_info)
+                return asn_info
         except Exception as e:
             logger.warning(f"Error getting ASN info for {ip_address}: {e}")
         
         return None
     
-    def _collect_ssl_data(self, domain_name):
-        """Collect SSL certificate information"""
+    def _collect_ssl_data(self, domain_name, ip_address=None):
+        """Collect SSL certificate information (connects to ip_address if given, verifying against domain_name)"""
         try:
+            if not ip_address:
+                # Reuse the address the DNS and geolocation steps resolve; let the connection resolve it otherwise
+                try:
+                    ip_address = self._resolve_ip(domain_name)
+                except OSError:
+                    ip_address = None
             context = ssl.create_default_context()
-            with socket.create_connection((domain_name, 443), timeout=COLLECTION_CONFIG['timeout']) as sock:
+            with socket.create_connection((ip_address or domain_name, 443), timeout=COLLECTION_CONFIG['timeout']) as sock:
                 with context.wrap_socket(sock, server_hostname=domain_name) as ssock:
                     cert = ssock.getpeercert()
                     
@@ -840,10 +1033,11 @@ class DomainCollector:
             logger.warning(f"Error collecting SSL data for {domain_name}: {e}")
             return {'ssl_valid': False, 'ssl_expiry': None}
     
-    def _collect_geolocation_data(self, domain_name):
+    def _collect_geolocation_data(self, domain_name, ip_address=None):
         """Collect geolocation data using MaxMind, with ipinfo.io fallback if enabled. Nominatim is not used for IPs."""
         try:
-            ip_address = socket.gethostbyname(domain_name)
+            if not ip_address:
+                ip_address = self._resolve_ip(domain_name)
             data = {'ip_address': ip_address}
             # Try MaxMind first
             if self.maxmind_reader:
@@ -882,9 +1076,9 @@ class DomainCollector:
             logger.warning(f'Error collecting geolocation data for {domain_name}: {e}')
             return {}
     
-    def _take_screenshot(self, domain_name):
-        """Take a screenshot of the domain"""
-        try:
+    def _get_screenshot_driver(self):
+        """Return the shared headless Chrome driver, starting it on first use"""
+        if self._driver is None:
             from selenium import webdriver
             from selenium.webdriver.chrome.service import Service
             from selenium.webdriver.chrome.options import Options
@@ -894,14 +1088,45 @@ class DomainCollector:
             chrome_options.add_argument('--headless')
             chrome_options.add_argument('--no-sandbox')
             chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options.add_argument('--disable-extensions')
+            chrome_options.add_argument('--disable-gpu')
+            # Return from driver.get() once the DOM is ready instead of after every subresource
+            chrome_options.page_load_strategy = 'eager'
+            if not DATA_CONFIG['screenshot_images']:
+                chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+                chrome_options.add_experimental_option(
+                    'prefs', {'profile.managed_default_content_settings.images': 2}
+                )
             
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
+            # Resolve the chromedriver binary once per process
+            if DomainCollector._chromedriver_path is None:
+                DomainCollector._chromedriver_path = ChromeDriverManager().install()
+            service = Service(DomainCollector._chromedriver_path)
+            self._driver = webdriver.Chrome(service=service, options=chrome_options)
+            self._driver.set_window_size(1920, 1080)
+        return self._driver
+    
+    def _quit_screenshot_driver(self):
+        """Shut down the shared Chrome driver if it is running"""
+        if self._driver is not None:
             try:
-                driver.set_window_size(1920, 1080)
+                self._driver.quit()
+            except Exception as e:
+                logger.debug(f"Error closing screenshot driver: {e}")
+            self._driver = None
+    
+    def _take_screenshot(self, domain_name):
+        """Take a screenshot of the domain"""
+        with self._driver_lock:
+            try:
+                from selenium.webdriver.support.ui import WebDriverWait
+                
+                driver = self._get_screenshot_driver()
                 driver.get(f"http://{domain_name}")
-                time.sleep(3)  # Wait for page to load
+                # Wait for page to load
+                WebDriverWait(driver, 10).until(
+                    lambda d: d.execute_script('return document.readyState') == 'complete'
+                )
                 
                 screenshot_path = os.path.join(
                     DATA_CONFIG['screenshot_dir'], 
@@ -911,18 +1136,19 @@ class DomainCollector:
                 
                 return screenshot_path
                 
-            finally:
-                driver.quit()
-                
-        except Exception as e:
-            logger.warning(f"Error taking screenshot for {domain_name}: {e}")
-            return None
+            except Exception as e:
+                logger.warning(f"Error taking screenshot for {domain_name}: {e}")
+                # Start from a fresh browser next time in case this one is wedged
+                self._quit_screenshot_driver()
+                return None
     
     def _collect_relationships_and_discover(self, domain_name, source_domain_id, shutdown_check=None):
         """Collect relationships and discover new URLs for queue with comprehensive filtering and shutdown support"""
         relationships = []
         discovered_urls = []
         excluded_count = 0
+        redirect_probes = {}
+        relationship_rows = []
         
         # Validate source_domain_id
         if not source_domain_id:
@@ -945,23 +1171,44 @@ class DomainCollector:
             # Don't skip relationship discovery even if URL was processed
             # We want to discover new relationships and URLs regardless
             
-            response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'])
-            response.raise_for_status()
+            response = self.session.get(url, timeout=COLLECTION_CONFIG['timeout'], stream=True)
+            try:
+                response.raise_for_status()
+                # Cap the body so very large pages cannot blow up memory
+                content = response.raw.read(_PAGE_READ_LIMIT, decode_content=True)
+            finally:
+                response.close()
             
             # Check for shutdown after network request
             if shutdown_check and shutdown_check():
                 logger.info("Shutdown requested after network request")
                 return relationships, discovered_urls
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            try:
+                soup = BeautifulSoup(content, 'lxml', parse_only=_ANCHOR_STRAINER)
+            except FeatureNotFound:
+                soup = BeautifulSoup(content, 'html.parser', parse_only=_ANCHOR_STRAINER)
             
             # Find ALL links on the page
-            all_links = soup.find_all('a', href=True)
+            all_links = soup.find_all('a')
             logger.info(f"Found {len(all_links)} total links on {domain_name}")
             
-            # Step 1: Filter and categorize all links
+            # Step 1: Calculate limits
+            max_links = COLLECTION_CONFIG['max_links_per_page']
+            max_internal_links = max(1, max_links // 4)  # 25% of max links for internal
+            max_external_links = max_links - max_internal_links  # Remaining for external
+            # Internal candidates all share the source domain, so they are skipped all-or-nothing
+            # and never more than max_internal_links are needed; external candidates are skipped
+            # per domain, so keep some spares for the ones dropped later
+            max_internal_candidates = max_internal_links
+            max_external_candidates = max_external_links * _EXTERNAL_CANDIDATE_FACTOR
+            
+            # Step 2: Filter and categorize links, stopping once both candidate lists are full
+            # Only the first occurrence of each internal URL / external domain is kept
             valid_internal_links = []
             valid_external_links = []
+            seen_internal_urls = set()
+            seen_external_domains = set()
             
             for link in all_links:
                 # Check for shutdown during link processing
@@ -969,6 +1216,11 @@ class DomainCollector:
                     logger.info("Shutdown requested during link processing")
                     return relationships, discovered_urls
                 
+                internal_full = len(valid_internal_links) >= max_internal_candidates
+                external_full = len(valid_external_links) >= max_external_candidates
+                if internal_full and external_full:
+                    break
+                
                 href = link.get('href')
                 link_text = link.get_text().strip()
                 
@@ -976,23 +1228,21 @@ class DomainCollector:
                 if not href:
                     continue
                 
+                # Parse the URL once; the result is reused by the filters and link loops
+                parsed_url = urlparse(href)
+                
                 # Check if URL should be excluded
-                should_exclude, reason = self._should_exclude_url(href, link_text)
+                should_exclude, reason = self._should_exclude_url(href, link_text, parsed_url)
                 if should_exclude:
                     excluded_count += 1
                     continue
                 
-                # Parse the URL
-                parsed_url = urlparse(href)
-                target_domain = parsed_url.netloc.lower()
-                
                 # Skip if no netloc (relative links, javascript, etc.)
-                if not target_domain:
+                if not parsed_url.netloc:
                     continue
                 
                 # Clean domain (remove www. prefix)
-                if target_domain.startswith('www.'):
-                    target_domain = target_domain[4:]
+                target_domain = _strip_www(parsed_url.netloc)
                 
                 # Validate domain format
                 if not self._is_valid_domain(target_domain):
@@ -1000,16 +1250,28 @@ class DomainCollector:
                 
                 # Categorize as internal or external
                 if target_domain == domain_name:
+                    if internal_full:
+                        continue
+                    # Clean URL for uniqueness check (remove parameters and fragments)
+                    clean_url = self._clean_url_for_queue(href, parsed_url)
+                    if clean_url in seen_internal_urls:
+                        continue
+                    seen_internal_urls.add(clean_url)
                     valid_internal_links.append({
                         'href': href,
                         'link_text': link_text,
-                        'domain': target_domain
+                        'domain': target_domain,
+                        'clean_url': clean_url
                     })
                 else:
+                    if external_full or target_domain in seen_external_domains:
+                        continue
+                    seen_external_domains.add(target_domain)
                     valid_external_links.append({
                         'href': href,
                         'link_text': link_text,
-                        'domain': target_domain
+                        'domain': target_domain,
+                        'clean_url': self._clean_url_for_queue(href, parsed_url)
                     })
             
             logger.info(f"Valid internal links: {len(valid_internal_links)}")
@@ -1020,175 +1282,74 @@ class DomainCollector:
                 logger.info("Shutdown requested before processing links")
                 return relationships, discovered_urls
             
-            # Step 2: Calculate limits
-            max_links = COLLECTION_CONFIG['max_links_per_page']
-            max_internal_links = max(1, max_links // 4)  # 25% of max links for internal
-            max_external_links = max_links - max_internal_links  # Remaining for external
+            # Preload processing counts and IDs for every candidate target in one query each
+            distinct_targets = {ld['domain'] for ld in valid_internal_links + valid_external_links}
+            processing_counts = self.db.get_domain_processing_counts(distinct_targets)
+            domain_ids = self.db.get_domain_ids(distinct_targets)
             
-            # Step 3: Add internal links (up to 25% of max)
-            internal_links_added = 0
-            unique_internal_urls = set()  # Track unique internal URLs, not domains
-            
-            for link_data in valid_internal_links:
-                # Check for shutdown during internal link processing
-                if shutdown_check and shutdown_check():
-                    logger.info("Shutdown requested during internal link processing")
-                    return relationships, discovered_urls
-                
-                if internal_links_added >= max_internal_links:
-                    break
-                
-                href = link_data['href']
-                link_text = link_data['link_text']
-                target_domain = link_data['domain']
-                
-                # Clean URL for uniqueness check (remove parameters and fragments)
-                clean_url = self._clean_url_for_queue(href)
-                
-                # Skip if we've already processed this internal URL
-                if clean_url in unique_internal_urls:
-                    continue
-                unique_internal_urls.add(clean_url)
-                
-                # Check domain processing limit
-                domain_processing_count = self.db.get_domain_processing_count(target_domain)
-                if domain_processing_count >= COLLECTION_CONFIG['max_urls_per_domain']:
-                    logger.info(f"Skipping internal {target_domain} - already processed {domain_processing_count} URLs")
-                    continue
-                
-                # Check if domain should be excluded
-                should_exclude_domain, reason = self._should_exclude_domain(target_domain)
-                if should_exclude_domain:
-                    logger.debug(f"Skipping excluded domain {target_domain}: {reason}")
-                    continue
-                
-                # Get or create target domain ID
-                target_domain_id = self.db.get_domain_id(target_domain)
+            def get_or_create_domain_id(target_domain):
+                target_domain_id = domain_ids.get(target_domain)
+                if not target_domain_id and target_domain not in distinct_targets:
+                    target_domain_id = self.db.get_domain_id(target_domain)
                 if not target_domain_id:
                     minimal_data = {'domain_name': target_domain}
                     target_domain_id = self.db.insert_domain(minimal_data)
-                
-                # Validate target_domain_id
-                if not target_domain_id:
-                    logger.warning(f"Failed to get/create target domain ID for {target_domain}, skipping relationship")
-                    continue
-
-                # --- Relationship Type Detection ---
-                rel_type = 'link'
-                ext_source = tldextract.extract(domain_name)
-                ext_target = tldextract.extract(target_domain)
-                # Subdomain: always mark as subdomain if source is parent of target
-                if (
-                    ext_source.domain == ext_target.domain and
-                    ext_source.suffix == ext_target.suffix and
+                domain_ids[target_domain] = target_domain_id
+                return target_domain_id
+            
+            # Suffix-list lookups for relationship type detection, shared by both link loops
+            ext_source = tldextract.extract(domain_name)
+            tld_cache = {}
+            
+            def extract(target_domain):
+                ext_target = tld_cache.get(target_domain)
+                if ext_target is None:
+                    ext_target = tld_cache[target_domain] = tldextract.extract(target_domain)
+                return ext_target
+            
+            def is_same_site(ext_target):
+                return ext_source.domain == ext_target.domain and ext_source.suffix == ext_target.suffix
+            
+            def is_subdomain_of_source(ext_target):
+                return (
+                    is_same_site(ext_target) and
                     ext_source.subdomain == '' and ext_target.subdomain != ''
-                ):
-                    rel_type = 'subdomain'
-                else:
-                    # Redirect: only if HTTP status is 3xx, final domain is different, and not protocol-only
-                    final_url = None
-                    if not href.startswith('#') and not href.lower().startswith('mailto:'):
-                        try:
-                            resp = self.session.head(href, allow_redirects=True, timeout=COLLECTION_CONFIG['timeout'])
-                            final_url = resp.url
-                            status_code = resp.status_code
-                            final_domain = urlparse(final_url).netloc.lower()
-                            if final_domain.startswith('www.'):
-                                final_domain = final_domain[4:]
-                            # Ignore protocol-only redirects (http <-> https on same domain)
-                            orig_url = urlparse(href)
-                            orig_domain = orig_url.netloc.lower()
-                            if orig_domain.startswith('www.'):
-                                orig_domain = orig_domain[4:]
-                            protocol_only = (final_domain == orig_domain and orig_url.scheme != urlparse(final_url).scheme)
-                            if (
-                                status_code >= 300 and status_code < 400 and
-                                final_domain and final_domain != target_domain and
-                                not protocol_only
-                            ):
-                                rel_type = 'redirect'
-                                # Check if redirect domain should be excluded
-                                should_exclude_redirect_domain, reason = self._should_exclude_domain(final_domain)
-                                if should_exclude_redirect_domain:
-                                    logger.debug(f"Skipping excluded redirect domain {final_domain}: {reason}")
-                                    continue
-                                
-                                # Insert redirect relationship
-                                final_domain_id = self.db.get_domain_id(final_domain)
-                                if not final_domain_id:
-                                    minimal_data = {'domain_name': final_domain}
-                                    final_domain_id = self.db.insert_domain(minimal_data)
-                                redirect_relationship = {
-                                    'type': 'redirect',
-                                    'link_text': link_text,
-                                    'link_url': href
-                                }
-                                self.db.insert_relationship(source_domain_id, final_domain_id, redirect_relationship)
-                                relationships.append({
-                                    'source': domain_name,
-                                    'target': final_domain,
-                                    'type': 'redirect',
-                                    'link_text': link_text,
-                                    'link_url': href
-                                })
-                        except Exception as e:
-                            logger.debug(f"Redirect check failed for {href}: {e}")
-                # Insert main relationship
-                relationship_data = {
-                    'type': rel_type,
-                    'link_text': link_text,
-                    'link_url': href
-                }
-                self.db.insert_relationship(source_domain_id, target_domain_id, relationship_data)
-                relationships.append({
-                    'source': domain_name,
-                    'target': target_domain,
-                    'type': rel_type,
-                    'link_text': link_text,
-                    'link_url': href
-                })
-                
-                # Add to discovery queue
-                discovered_urls.append({
-                    'url': clean_url,
-                    'domain': target_domain,
-                    'source_domain_id': source_domain_id
-                })
-                
-                internal_links_added += 1
-                logger.debug(f"Added internal link {internal_links_added}/{max_internal_links}: {clean_url}")
+                )
             
-            # Check for shutdown before external link processing
-            if shutdown_check and shutdown_check():
-                logger.info("Shutdown requested before external link processing")
-                return relationships, discovered_urls
+            # Start redirect-detection HEAD requests concurrently for the external links the
+            # loop is expected to use; anything not covered here is probed inline as before.
+            # Links within the source's registrable domain are never probed.
+            probe_hrefs = [
+                link_data['href'] for link_data in valid_external_links[:max_external_links]
+                if not is_same_site(extract(link_data['domain']))
+            ]
+            redirect_probes = self._start_redirect_probes(probe_hrefs)
             
-            # Step 4: Add external links (remaining slots)
-            external_links_added = 0
-            unique_external_domains = set()  # For external, still count unique domains
+            # Step 3: Add internal links (up to 25% of max), then external links (remaining slots)
+            links_added = {'internal': 0, 'external': 0}
+            link_limits = {'internal': max_internal_links, 'external': max_external_links}
             
-            for link_data in valid_external_links:
-                # Check for shutdown during external link processing
+            for link_data, category in chain(
+                ((ld, 'internal') for ld in valid_internal_links),
+                ((ld, 'external') for ld in valid_external_links)
+            ):
+                # Check for shutdown during link processing
                 if shutdown_check and shutdown_check():
-                    logger.info("Shutdown requested during external link processing")
+                    logger.info(f"Shutdown requested during {category} link processing")
                     return relationships, discovered_urls
                 
-                if external_links_added >= max_external_links:
-                    break
+                if links_added[category] >= link_limits[category]:
+                    continue
                 
                 href = link_data['href']
                 link_text = link_data['link_text']
                 target_domain = link_data['domain']
-                
-                # Skip if we've already processed this external domain
-                if target_domain in unique_external_domains:
-                    continue
-                unique_external_domains.add(target_domain)
+                clean_url = link_data['clean_url']
                 
                 # Check domain processing limit
-                domain_processing_count = self.db.get_domain_processing_count(target_domain)
+                domain_processing_count = processing_counts.get(target_domain, 0)
                 if domain_processing_count >= COLLECTION_CONFIG['max_urls_per_domain']:
-                    logger.info(f"Skipping external {target_domain} - already processed {domain_processing_count} URLs")
+                    logger.info(f"Skipping {category} {target_domain} - already processed {domain_processing_count} URLs")
                     continue
                 
                 # Check if domain should be excluded
@@ -1198,10 +1359,7 @@ class DomainCollector:
                     continue
                 
                 # Get or create target domain ID
-                target_domain_id = self.db.get_domain_id(target_domain)
-                if not target_domain_id:
-                    minimal_data = {'domain_name': target_domain}
-                    target_domain_id = self.db.insert_domain(minimal_data)
+                target_domain_id = get_or_create_domain_id(target_domain)
                 
                 # Validate target_domain_id
                 if not target_domain_id:
@@ -1209,34 +1367,28 @@ class DomainCollector:
                     continue
 
                 # --- Relationship Type Detection ---
+                # Internal links and sibling subdomains share the source's registrable domain,
+                # so only other sites are probed for redirects
                 rel_type = 'link'
-                ext_source = tldextract.extract(domain_name)
-                ext_target = tldextract.extract(target_domain)
-                if (
-                    ext_source.domain == ext_target.domain and
-                    ext_source.suffix == ext_target.suffix and
-                    ext_source.subdomain == '' and ext_target.subdomain != ''
-                ):
+                ext_target = extract(target_domain)
+                if is_subdomain_of_source(ext_target):
                     rel_type = 'subdomain'
-                else:
-                    final_url = None
+                elif not is_same_site(ext_target):
+                    # Redirect: only if HTTP status is 3xx and the final domain is different
                     if not href.startswith('#') and not href.lower().startswith('mailto:'):
                         try:
-                            resp = self.session.head(href, allow_redirects=True, timeout=COLLECTION_CONFIG['timeout'])
-                            final_url = resp.url
+                            probe = redirect_probes.get(href)
+                            if probe:
+                                resp = probe.result()
+                            else:
+                                resp = self.session.head(href, allow_redirects=True, timeout=COLLECTION_CONFIG['timeout'])
                             status_code = resp.status_code
-                            final_domain = urlparse(final_url).netloc.lower()
-                            if final_domain.startswith('www.'):
-                                final_domain = final_domain[4:]
-                            orig_url = urlparse(href)
-                            orig_domain = orig_url.netloc.lower()
-                            if orig_domain.startswith('www.'):
-                                orig_domain = orig_domain[4:]
-                            protocol_only = (final_domain == orig_domain and orig_url.scheme != urlparse(final_url).scheme)
+                            final_domain = _strip_www(urlparse(resp.url).netloc)
+                            # Protocol-only redirects (http <-> https on same domain) keep
+                            # final_domain == target_domain and are ignored here
                             if (
                                 status_code >= 300 and status_code < 400 and
-                                final_domain and final_domain != target_domain and
-                                not protocol_only
+                                final_domain and final_domain != target_domain
                             ):
                                 rel_type = 'redirect'
                                 # Check if redirect domain should be excluded
@@ -1245,16 +1397,9 @@ class DomainCollector:
                                     logger.debug(f"Skipping excluded redirect domain {final_domain}: {reason}")
                                     continue
                                 
-                                final_domain_id = self.db.get_domain_id(final_domain)
-                                if not final_domain_id:
-                                    minimal_data = {'domain_name': final_domain}
-                                    final_domain_id = self.db.insert_domain(minimal_data)
-                                redirect_relationship = {
-                                    'type': 'redirect',
-                                    'link_text': link_text,
-                                    'link_url': href
-                                }
-                                self.db.insert_relationship(source_domain_id, final_domain_id, redirect_relationship)
+                                # Insert redirect relationship
+                                final_domain_id = get_or_create_domain_id(final_domain)
+                                relationship_rows.append((source_domain_id, final_domain_id, 'redirect', link_text, href))
                                 relationships.append({
                                     'source': domain_name,
                                     'target': final_domain,
@@ -1264,12 +1409,9 @@ class DomainCollector:
                                 })
                         except Exception as e:
                             logger.debug(f"Redirect check failed for {href}: {e}")
-                relationship_data = {
-                    'type': rel_type,
-                    'link_text': link_text,
-                    'link_url': href
-                }
-                self.db.insert_relationship(source_domain_id, target_domain_id, relationship_data)
+                
+                # Insert main relationship
+                relationship_rows.append((source_domain_id, target_domain_id, rel_type, link_text, href))
                 relationships.append({
                     'source': domain_name,
                     'target': target_domain,
@@ -1277,21 +1419,23 @@ class DomainCollector:
                     'link_text': link_text,
                     'link_url': href
                 })
-                clean_url = self._clean_url_for_queue(href)
-                discovered_urls.append({
-                    'url': clean_url,
-                    'domain': target_domain,
-                    'source_domain_id': source_domain_id
-                })
-                external_links_added += 1
-                logger.debug(f"Added external link {external_links_added}/{max_external_links}: {target_domain}")
+                
+                # Add to discovery queue
+                discovered_urls.append(DiscoveredUrl(clean_url, target_domain, source_domain_id))
+                
+                links_added[category] += 1
+                logger.debug(f"Added {category} link {links_added[category]}/{link_limits[category]}: {clean_url}")
+            
+            # Write all relationships for this page in one batch
+            self.db.insert_relationships_bulk(relationship_rows)
+            relationship_rows = []
             
             # Record URL processing
             self.db.record_url_processing(url, domain_name, 'success', len(relationships))
             
             logger.info(f"Found {len(relationships)} relationships and discovered {len(discovered_urls)} URLs for {domain_name}")
-            logger.info(f"Internal links added: {internal_links_added}/{max_internal_links}")
-            logger.info(f"External links added: {external_links_added}/{max_external_links}")
+            logger.info(f"Internal links added: {links_added['internal']}/{max_internal_links}")
+            logger.info(f"External links added: {links_added['external']}/{max_external_links}")
             if excluded_count > 0:
                 logger.info(f"Excluded {excluded_count} URLs due to filtering rules")
             
@@ -1299,52 +1443,79 @@ class DomainCollector:
             logger.warning(f"Error collecting relationships for {domain_name}: {e}")
             # Record failed processing
             self.db.record_url_processing(url, domain_name, 'failed', 0)
+        finally:
+            # Drop probes for links that ended up skipped
+            for probe in redirect_probes.values():
+                probe.cancel()
+            # Keep relationships gathered before a shutdown or error
+            if relationship_rows:
+                try:
+                    self.db.insert_relationships_bulk(relationship_rows)
+                except Exception as e:
+                    logger.warning(f"Error saving relationships for {domain_name}: {e}")
         
         return relationships, discovered_urls
     
+    def _start_redirect_probes(self, hrefs):
+        """Submit redirect-detection HEAD requests concurrently; returns a dict of href -> Future"""
+        probes = {}
+        for href in hrefs:
+            if href in probes or href.startswith('#') or href.lower().startswith('mailto:'):
+                continue
+            probes[href] = self._probe_pool.submit(
+                self.session.head, href, allow_redirects=True, timeout=COLLECTION_CONFIG['timeout']
+            )
+        return probes
+    
     def _is_valid_domain(self, domain):
         """Check if domain is valid"""
         if not domain:
             return False
         
-        # Basic domain validation
-        domain_pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$'
-        return bool(re.match(domain_pattern, domain))
+        # Basic domain validation, one label at a time to avoid backtracking on long inputs
+        if len(domain) > 253:
+            return False
+        return all(_DOMAIN_LABEL_RE.match(label) for label in domain.split('.'))
     
-    def add_discovered_urls_to_queue(self, discovered_urls, depth=1):
+    def add_discovered_urls_to_queue(self, discovered_urls, depth=1, db=None):
         """Add discovered URLs to the queue for future processing with duplicate prevention"""
-        added_count = 0
+        if db is None:
+            db = self.db
         skipped_count = 0
-        
-        for url_data in discovered_urls:
-            try:
-                url = url_data['url']
-                domain_name = url_data['domain']
-                
-                # Check if URL is already in the queue (better than checking if processed)
-                if self.db.is_url_in_queue(url):
-                    skipped_count += 1
-                    continue
-                
-                # Check domain processing limit
-                domain_processing_count = self.db.get_domain_processing_count(domain_name)
-                if domain_processing_count >= COLLECTION_CONFIG['max_urls_per_domain']:
-                    skipped_count += 1
-                    continue
-                
-                self.db.add_to_discovery_queue(
-                    url=url,
-                    domain_name=domain_name,
-                    source_domain_id=url_data.get('source_domain_id'),
-                    depth=depth,
-                    priority=1
-                )
-                added_count += 1
-                
-            except Exception as e:
-                logger.warning(f"Error adding URL to queue: {e}")
+        candidates = []
+        seen_urls = set()
+
+        for url, domain_name, source_domain_id, url_depth in discovered_urls:
+            # Skip duplicates within this batch
+            if url in seen_urls:
                 skipped_count += 1
-        
+                continue
+            seen_urls.add(url)
+
+            candidates.append((url, domain_name, source_domain_id, depth if url_depth is None else url_depth))
+
+        # Check queue membership and domain processing counts for the whole batch at once
+        not_queued = set(db.filter_urls_not_in_queue(url for url, _, _, _ in candidates))
+        processing_counts = db.get_domain_processing_counts({domain_name for _, domain_name, _, _ in candidates})
+
+        rows = []
+        for url, domain_name, source_domain_id, url_depth in candidates:
+            # Check if URL is already in the queue (better than checking if processed)
+            if url not in not_queued:
+                skipped_count += 1
+                continue
+
+            # Check domain processing limit
+            if processing_counts.get(domain_name, 0) >= COLLECTION_CONFIG['max_urls_per_domain']:
+                skipped_count += 1
+                continue
+
+            rows.append((url, domain_name, source_domain_id, url_depth, 1))
+
+        # Insert all accepted URLs in one round-trip
+        added_count = db.add_many_to_discovery_queue(rows)
+        skipped_count += len(rows) - added_count
+
         logger.info(f"Added {added_count} URLs to queue, skipped {skipped_count} duplicates/limits")
     
     def process_queue(self, max_items=None, max_depth=3, shutdown_check=None):
@@ -1356,6 +1527,11 @@ class DomainCollector:
         # Clean up any stuck transactions before starting
         self.db.cleanup_stuck_transactions()
         
+        # Completions are written once per batch; items of the current batch that are not
+        # finished yet are the ones to requeue on interrupt
+        pending_completions = []
+        unfinished_ids = set()
+        
         try:
             while True:
                 # Check for shutdown
@@ -1372,119 +1548,142 @@ class DomainCollector:
                 
                 logger.info(f"Process {self.process_id}: Processing {len(queue_items)} items from queue")
                 
-                for item in queue_items:
-                    # Check for shutdown before each item
-                    if shutdown_check and shutdown_check():
-                        logger.info("Shutdown requested, stopping queue processing")
-                        return
-                    
-                    try:
-                        domain_name = item['domain_name']
-                        depth = item['depth']
-                        url = item['url']
-                        
-                        # Skip if we've reached max depth
-                        if depth >= max_depth:
-                            logger.info(f"Skipping {domain_name} - reached max depth")
-                            self.db.mark_queue_item_skipped(item['id'], "Max depth reached")
-                            continue
-                        
-                        # Check if URL is already in queue (better than checking if processed)
-                        if self.db.is_url_in_queue(url, exclude_id=item['id']):
-                            logger.info(f"URL {url} already in queue, skipping")
-                            self.db.mark_queue_item_skipped(item['id'], "Already in queue")
-                            continue
-                        
-                        # Check domain processing limit
-                        domain_processing_count = self.db.get_domain_processing_count(domain_name)
-                        if domain_processing_count >= COLLECTION_CONFIG['max_urls_per_domain']:
-                            logger.info(f"Skipping {domain_name} - reached processing limit ({domain_processing_count})")
-                            self.db.mark_queue_item_skipped(item['id'], "Domain processing limit reached")
-                            continue
-                        
-                        # Collect domain data
-                        domain_id, relationships = self.collect_domain_data(domain_name, depth, url, shutdown_check, write_discoveries=True)
-                        
-                        # Mark as completed
-                        self.db.mark_queue_item_completed(item['id'], success=True)
-                        
-                        # Respect rate limiting
-                        time.sleep(COLLECTION_CONFIG['request_delay'])
+                # Domain processing counts for the whole batch in one query
+                processing_counts = self.db.get_domain_processing_counts({item['domain_name'] for item in queue_items})
+                
+                # Warm the robots.txt cache for the batch's hosts in parallel
+                self._prefetch_robots_rules(item['domain_name'] for item in queue_items)
+                
+                unfinished_ids = {item['id'] for item in queue_items}
+                try:
+                    for item in queue_items:
+                        # Check for shutdown before each item
+                        if shutdown_check and shutdown_check():
+                            logger.info("Shutdown requested, stopping queue processing")
+                            return
                         
-                    except Exception as e:
-                        logger.error(f"Error processing queue item {item['id']}: {e}")
-                        self.db.mark_queue_item_completed(item['id'], success=False, error_message=str(e))
+                        try:
+                            domain_name = item['domain_name']
+                            depth = item['depth']
+                            url = item['url']
+                            
+                            # Skip if we've reached max depth
+                            if depth >= max_depth:
+                                logger.info(f"Skipping {domain_name} - reached max depth")
+                                self.db.mark_queue_item_skipped(item['id'], "Max depth reached")
+                                unfinished_ids.discard(item['id'])
+                                continue
+                            
+                            # Check domain processing limit
+                            domain_processing_count = processing_counts.get(domain_name, 0)
+                            if domain_processing_count >= COLLECTION_CONFIG['max_urls_per_domain']:
+                                logger.info(f"Skipping {domain_name} - reached processing limit ({domain_processing_count})")
+                                self.db.mark_queue_item_skipped(item['id'], "Domain processing limit reached")
+                                unfinished_ids.discard(item['id'])
+                                continue
+                            
+                            # Respect rate limiting (only waits if this host was hit very recently)
+                            self._wait_for_host(domain_name)
+                            
+                            # Collect domain data
+                            domain_id, relationships = self.collect_domain_data(domain_name, depth, url, shutdown_check, write_discoveries=True)
+                            
+                            # Count this URL so the per-domain limit also holds for later items of the same batch
+                            processing_counts[domain_name] = domain_processing_count + 1
+                            
+                            # Mark as completed
+                            pending_completions.append((item['id'], True, None))
+                            unfinished_ids.discard(item['id'])
+                            
+                        except Exception as e:
+                            logger.error(f"Error processing queue item {item['id']}: {e}")
+                            pending_completions.append((item['id'], False, str(e)))
+                            unfinished_ids.discard(item['id'])
+                finally:
+                    # Write the batch's completions in one transaction
+                    self.db.bulk_mark_completed(pending_completions)
+                    pending_completions.clear()
                         
         except KeyboardInterrupt:
             logger.info("Queue processing interrupted by user")
             # Clean up any stuck transactions
             self.db.cleanup_stuck_transactions()
-            # Mark any remaining processing items as interrupted (reset to pending)
-            try:
-                cursor = self.db.connection.cursor()
-                cursor.execute("""
-                    UPDATE discovery_queue 
-                    SET status = 'pending', processed_at = NULL, error_message = 'Processing interrupted'
-                    WHERE status = 'processing'
-                """)
-                self.db.connection.commit()
-                cursor.close()
+            # Reset this batch's unfinished items to pending, leaving other workers' items alone
+            if self.db.mark_queue_items_interrupted(unfinished_ids):
                 logger.info("Marked interrupted queue items as pending for retry")
-            except Exception as e:
-                logger.error(f"Error marking interrupted items: {e}")
         except Exception as e:
             logger.error(f"Queue processing failed: {e}")
             # Clean up any stuck transactions
             self.db.cleanup_stuck_transactions()
     
+    def _wait_for_host(self, domain_name):
+        """Sleep until request_delay has passed since the last visit to this host, then record this visit"""
+        delay = COLLECTION_CONFIG['request_delay']
+        with self._cache_lock:
+            last_visit = self._host_last_visit.pop(domain_name, None)
+        if last_visit is not None:
+            remaining = delay - (time.monotonic() - last_visit)
+            if remaining > 0:
+                time.sleep(remaining)
+        with self._cache_lock:
+            # Entries older than the delay no longer matter, so evicting the oldest is harmless
+            if len(self._host_last_visit) >= _LOOKUP_CACHE_SIZE:
+                self._host_last_visit.pop(next(iter(self._host_last_visit)))
+            self._host_last_visit[domain_name] = time.monotonic()
+    
     def crawl_from_seed_domains(self, seed_domains, max_depth=2):
         """Crawl domains starting from seed domains"""
+        # Domains are marked visited when queued, so each one enters the BFS frontier at most once
         visited = set()
-        to_visit = [(domain, 0) for domain in seed_domains]  # (domain, depth)
+        to_visit = deque()  # (domain, depth)
+        for domain in seed_domains:
+            domain = domain.lower().rstrip('.')
+            if domain not in visited:
+                visited.add(domain)
+                to_visit.append((domain, 0))
         
         while to_visit:
-            domain, depth = to_visit.pop(0)
-            
-            if domain in visited or depth > max_depth:
-                continue
-            
-            visited.add(domain)
+            domain, depth = to_visit.popleft()
             
             try:
+                # Respect rate limiting (only waits if this host was hit very recently)
+                self._wait_for_host(domain)
+                
                 logger.info(f"Crawling {domain} at depth {depth}")
                 domain_id, relationships = self.collect_domain_data(domain, depth, write_discoveries=True)
                 
                 # Add new domains to visit if not at max depth
                 if depth < max_depth:
                     for rel in relationships:
-                        target_domain = rel['target']
+                        target_domain = rel['target'].lower().rstrip('.')
                         if target_domain not in visited:
+                            visited.add(target_domain)
                             to_visit.append((target_domain, depth + 1))
                 
-                # Respect rate limiting
-                time.sleep(COLLECTION_CONFIG['request_delay'])
-                
             except Exception as e:
                 logger.error(f"Error crawling {domain}: {e}")
     
     def close(self):
         """Clean up resources"""
         self.db.close()
+        self._lookup_pool.shutdown(wait=False)
+        self._collect_pool.shutdown(wait=False, cancel_futures=True)
+        self._probe_pool.shutdown(wait=False, cancel_futures=True)
+        self._quit_screenshot_driver()
         self.session.close()
+        # Only close the MaxMind readers if they were actually opened
+        for reader_name in ('maxmind_reader', 'maxmind_asn_reader'):
+            reader = self.__dict__.get(reader_name)
+            if reader:
+                reader.close()
 
     def _parse_robots_txt(self, content):
         """Parse robots.txt into a dict of user-agent -> list of (type, value) rules."""
         rules = {}
         current_agents = []
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            if ':' not in line:
-                continue
-            directive, value = line.split(':', 1)
-            directive = directive.strip().lower()
-            value = value.strip()
+        for match in _ROBOTS_DIRECTIVE_RE.finditer(content):
+            directive = match.group(1).lower()
+            value = match.group(2)
             if directive == 'user-agent':
                 agent = value.lower()
                 current_agents.append(agent)
@@ -1498,62 +1697,129 @@ class DomainCollector:
                 current_agents = []
         return rules
 
-    def _path_matches(self, path, rule_value):
-        """Check if a path matches a robots.txt rule value."""
-        if not rule_value:
-            return True  # Empty rule matches everything
-        if not rule_value.startswith('/'):
-            rule_value = '/' + rule_value
-        # Simple prefix matching
-        return path.startswith(rule_value)
+    def _compile_robots_rules(self, rules):
+        """Compile Allow/Disallow rules into (allow_re, disallow_re) prefix patterns, longest rule first."""
+        compiled = []
+        for wanted in ('allow', 'disallow'):
+            values = set()
+            for rule_type, rule_value in rules:
+                if rule_type != wanted:
+                    continue
+                if not rule_value:
+                    rule_value = '/'  # Disallow: (empty) means block all
+                if not rule_value.startswith('/'):
+                    rule_value = '/' + rule_value
+                values.add(rule_value)
+            if values:
+                # Alternation tries branches in order, so longest-first yields the longest matching prefix
+                ordered = sorted(values, key=len, reverse=True)
+                compiled.append(re.compile('|'.join(re.escape(v) for v in ordered)))
+            else:
+                compiled.append(None)
+        return tuple(compiled)
 
-    def _find_robots_decision(self, path, rules):
+    def _find_robots_decision(self, path, compiled_rules):
         """Apply longest-match-wins logic for Allow/Disallow rules."""
         # Normalize path
         if not path.startswith('/'):
             path = '/' + path
-        matched = None
-        matched_type = None
-        matched_value = None
-        max_len = -1
-        for rule_type, rule_value in rules:
-            if not rule_value:
-                rule_value = '/'  # Disallow: (empty) means block all
-            if self._path_matches(path, rule_value):
-                if len(rule_value) > max_len:
-                    matched = rule_type
-                    matched_type = rule_type
-                    matched_value = rule_value
-                    max_len = len(rule_value)
+        allow_re, disallow_re = compiled_rules
+        allow_match = allow_re.match(path) if allow_re else None
+        disallow_match = disallow_re.match(path) if disallow_re else None
         # If no match, allowed
-        if matched is None:
+        if not allow_match and not disallow_match:
             return True, 'none', ''
-        # If both Allow and Disallow match, Allow wins if it's the longest
-        if matched_type == 'allow':
-            return True, matched_type, matched_value
-        else:
-            return False, matched_type, matched_value
+        # If both Allow and Disallow match, Allow wins if it's at least as long
+        if allow_match and (not disallow_match or allow_match.end() >= disallow_match.end()):
+            return True, 'allow', allow_match.group()
+        return False, 'disallow', disallow_match.group()
 
-    def _check_robots_txt(self, domain_name, path='/'):
-        """Check robots.txt to see if we're allowed to scrape a specific path on this domain, with proper user-agent and rule precedence handling."""
-        if not COLLECTION_CONFIG.get('respect_robots_txt', True):
-            logger.debug(f"Robots.txt checking disabled for {domain_name}")
-            return True
+    def _get_robots_rules(self, domain_name):
+        """Fetch and compile the robots.txt rules that apply to our user-agent, reusing them for up to a day per host"""
+        compiled_rules = self._cache_get(self._robots_cache, domain_name, _ROBOTS_CACHE_TTL)
+        if compiled_rules is not None:
+            return compiled_rules
+        # An unreachable host would otherwise cost a full timeout on every check
+        if self._cache_get(self._robots_error_cache, domain_name, _ROBOTS_ERROR_TTL) is not None:
+            return (None, None)
+        matched_rules = self._fetch_robots_rules(domain_name)
+        if matched_rules is None:
+            return (None, None)
+        compiled_rules = self._compile_robots_rules(matched_rules)
+        self._cache_put(self._robots_cache, domain_name, compiled_rules)
+        return compiled_rules
+
+    def _fetch_robots_rules(self, domain_name):
+        """Download robots.txt and return the (type, value) rules for our user-agent, or None if it could not be fetched"""
+        robots_url = f"http://{domain_name}/robots.txt"
         try:
-            robots_url = f"http://{domain_name}/robots.txt"
-            response = self.session.get(robots_url, timeout=COLLECTION_CONFIG['timeout'])
-            if response.status_code != 200:
-                logger.info(f"Robots.txt not found for {domain_name} (status: {response.status_code})")
-                return True
-            robots_content = response.text
+            response = self.session.get(robots_url, timeout=min(_ROBOTS_TIMEOUT, COLLECTION_CONFIG['timeout']), stream=True)
+            try:
+                status_code = response.status_code
+                raw_content = response.raw.read(_ROBOTS_READ_LIMIT, decode_content=True) if status_code == 200 else b''
+                encoding = response.encoding or 'utf-8'
+            finally:
+                response.close()
+        except requests.RequestException as e:
+            logger.info(f"Could not fetch robots.txt for {domain_name}: {e}")
+            self._cache_put(self._robots_error_cache, domain_name, True)
+            return None
+        if status_code != 200:
+            logger.info(f"Robots.txt not found for {domain_name} (status: {status_code})")
+            matched_rules = []
+        else:
+            robots_content = raw_content.decode(encoding, errors='replace')
             logger.debug(f"Robots.txt content for {domain_name}:\n{robots_content}")
             # Parse robots.txt into user-agent sections
             rules = self._parse_robots_txt(robots_content)
             # Find the best matching user-agent section
             ua = COLLECTION_CONFIG['http_user_agent']
             matched_rules = rules.get(ua, []) + rules.get('*', [])
+        return matched_rules
+
+    def _prefetch_robots_rules(self, domain_names):
+        """Load robots.txt rules for several hosts so later checks hit the cache.
+
+        Rules another worker stored in the database within the last day are reused; the rest
+        are fetched concurrently and stored for the other workers.
+        """
+        if not COLLECTION_CONFIG.get('respect_robots_txt', True):
+            return
+        missing = {
+            domain_name for domain_name in domain_names
+            if self._cache_get(self._robots_cache, domain_name, _ROBOTS_CACHE_TTL) is None
+            and self._cache_get(self._robots_error_cache, domain_name, _ROBOTS_ERROR_TTL) is None
+        }
+        if not missing:
+            return
+        stored_rules = self.db.get_robots_rules(missing, _ROBOTS_CACHE_TTL)
+        for domain_name, matched_rules in stored_rules.items():
+            self._cache_put(self._robots_cache, domain_name, self._compile_robots_rules(matched_rules))
+        
+        futures = {
+            self._probe_pool.submit(self._fetch_robots_rules, domain_name): domain_name
+            for domain_name in missing - stored_rules.keys()
+        }
+        wait(futures)
+        fetched_rows = []
+        for future, domain_name in futures.items():
+            # Failures are ignored here; _check_robots_txt retries and logs them
+            if future.exception() is not None or future.result() is None:
+                continue
+            matched_rules = future.result()
+            self._cache_put(self._robots_cache, domain_name, self._compile_robots_rules(matched_rules))
+            fetched_rows.append((domain_name, matched_rules))
+        self.db.save_robots_rules(fetched_rows)
+
+    def _check_robots_txt(self, domain_name, path='/'):
+        """Check robots.txt to see if we're allowed to scrape a specific path on this domain, with proper user-agent and rule precedence handling."""
+        if not COLLECTION_CONFIG.get('respect_robots_txt', True):
+            logger.debug(f"Robots.txt checking disabled for {domain_name}")
+            return True
+        try:
+            compiled_rules = self._get_robots_rules(domain_name)
             # Find the most specific rule for the path
-            decision, rule_type, rule_value = self._find_robots_decision(path, matched_rules)
+            decision, rule_type, rule_value = self._find_robots_decision(path, compiled_rules)
             if decision is False:
                 logger.warning(f"Robots.txt for {domain_name} blocks path {path} due to {rule_type}: {rule_value}")
             else:
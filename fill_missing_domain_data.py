@@ -11,9 +11,13 @@ Excludes screenshot_path as requested.
 """
 
 import logging
-import time
 import signal
+import socket
 import sys
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from domain_collector import DomainCollector
 from database import DatabaseManager
@@ -26,12 +30,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of collected domains written per bulk upsert
+_UPDATE_BATCH_SIZE = 200
+
+# Number of domains read per page by get_all_domains
+_DOMAIN_PAGE_SIZE = 1000
+
+# Job name under which the backfill records its resume point
+_CHECKPOINT_JOB = 'fill_missing_domain_data'
+
+# Fields the backfill checks for, and one bit per field so field groups can be tested with a mask
+REQUIRED_FIELDS = (
+    'title', 'description', 'favicon_url', 'created_date', 'expiry_date',
+    'registrar', 'nameservers', 'asn', 'asn_description', 'ssl_valid',
+    'ssl_expiry', 'country', 'ip_address', 'latitude', 'longitude',
+    'category', 'tags'
+)
+REQUIRED_BITS = {field: 1 << i for i, field in enumerate(REQUIRED_FIELDS)}
+
+def _fields_mask(fields):
+    """Combine the bits of the given fields into one mask"""
+    mask = 0
+    for field in fields:
+        mask |= REQUIRED_BITS.get(field, 0)
+    return mask
+
+WEB_MASK = _fields_mask(('title', 'description', 'favicon_url'))
+WHOIS_MASK = _fields_mask(('created_date', 'expiry_date', 'registrar'))
+DNS_MASK = _fields_mask(('nameservers', 'asn', 'asn_description'))
+SSL_MASK = _fields_mask(('ssl_valid', 'ssl_expiry'))
+GEO_MASK = _fields_mask(('country', 'ip_address', 'latitude', 'longitude'))
+
 class DomainDataFiller:
     def __init__(self):
         """Initialize the domain data filler"""
         self.db = DatabaseManager()
         self.collector = DomainCollector()
-        self.shutdown_requested = False
+        # Set by the signal handler; waits on it return as soon as shutdown is requested
+        self._shutdown_event = threading.Event()
+        
+        # Domains are collected concurrently; each runs its independent collectors side by side
+        self._parallel_domains = max(1, COLLECTION_CONFIG.get('parallel_domains', 4))
+        self._domain_pool = ThreadPoolExecutor(max_workers=self._parallel_domains, thread_name_prefix='fill-domain')
+        self._io_pool = ThreadPoolExecutor(max_workers=5 * self._parallel_domains, thread_name_prefix='fill')
+        
+        # One semaphore per registrable domain so the same host is never hit concurrently;
+        # host -> [semaphore, number of collections using it], removed when unused
+        self._host_sems = {}
+        self._host_sems_lock = threading.Lock()
+        
+        # Resume after the last domain ID a previous run fully processed
+        self.last_id = self.db.get_backfill_checkpoint(_CHECKPOINT_JOB)
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -40,82 +89,72 @@ class DomainDataFiller:
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
-        self.shutdown_requested = True
+        self._shutdown_event.set()
     
-    def get_all_domains(self):
-        """Get all domains from the database"""
-        cursor = None
-        try:
-            cursor = self.db.connection.cursor(dictionary=True)
-            query = "SELECT id, domain_name FROM domains ORDER BY domain_name"
-            cursor.execute(query)
-            domains = cursor.fetchall()
-            logger.info(f"Found {len(domains)} domains in database")
-            return domains
-        except Exception as e:
-            logger.error(f"Error getting domains: {e}")
-            return []
-        finally:
-            if cursor:
-                cursor.close()
+    @property
+    def shutdown_requested(self):
+        """Whether a shutdown signal has been received"""
+        return self._shutdown_event.is_set()
+    
+    def reset_checkpoint(self):
+        """Forget the resume point so the next run starts from the first domain"""
+        self.last_id = 0
+        self.db.save_backfill_checkpoint(_CHECKPOINT_JOB, 0)
     
-    def get_domain_current_data(self, domain_name):
-        """Get current domain data from database"""
+    def count_domains(self, after_id=0):
+        """Get the number of domains with an ID above after_id"""
         cursor = None
         try:
-            cursor = self.db.connection.cursor(dictionary=True)
-            query = """
-                SELECT title, description, favicon_url, created_date, expiry_date,
-                       registrar, nameservers, asn, asn_description, ssl_valid,
-                       ssl_expiry, country, ip_address, latitude, longitude,
-                       category, tags
-                FROM domains 
-                WHERE domain_name = %s
-            """
-            cursor.execute(query, (domain_name,))
+            cursor = self.db.connection.cursor()
+            cursor.execute("SELECT COUNT(*) FROM domains WHERE id > %s", (after_id,))
             result = cursor.fetchone()
-            return result
+            return result[0] if result else 0
         except Exception as e:
-            logger.error(f"Error getting domain data for {domain_name}: {e}")
-            return None
+            logger.error(f"Error counting domains: {e}")
+            return 0
         finally:
             if cursor:
                 cursor.close()
     
+    def get_all_domains(self, after_id=0):
+        """Yield domains with an ID above after_id in ID order, one page at a time, with their current data"""
+        # Keyset pages keep memory bounded without holding an unbuffered result open,
+        # which would block the other queries made on this connection while iterating
+        last_id = after_id
+        while True:
+            cursor = None
+            try:
+                cursor = self.db.connection.cursor(dictionary=True)
+                query = """
+                    SELECT id, domain_name, title, description, favicon_url, created_date,
+                           expiry_date, registrar, nameservers, asn, asn_description,
+                           ssl_valid, ssl_expiry, country, ip_address, latitude, longitude,
+                           category, tags
+                    FROM domains
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """
+                cursor.execute(query, (last_id, _DOMAIN_PAGE_SIZE))
+                domains = cursor.fetchall()
+            except Exception as e:
+                # Ending quietly would look like the last page and reset the resume point
+                logger.error(f"Error getting domains: {e}")
+                raise
+            finally:
+                if cursor:
+                    cursor.close()
+            
+            yield from domains
+            if len(domains) < _DOMAIN_PAGE_SIZE:
+                return
+            last_id = domains[-1]['id']
+    
     def identify_missing_fields(self, domain_data):
         """Identify which fields are missing from domain data"""
         if not domain_data:
-            return ['title', 'description', 'favicon_url', 'created_date', 'expiry_date',
-                   'registrar', 'nameservers', 'asn', 'asn_description', 'ssl_valid',
-                   'ssl_expiry', 'country', 'ip_address', 'latitude', 'longitude',
-                   'category', 'tags']
-        
-        missing_fields = []
-        field_mapping = {
-            'title': 'title',
-            'description': 'description', 
-            'favicon_url': 'favicon_url',
-            'created_date': 'created_date',
-            'expiry_date': 'expiry_date',
-            'registrar': 'registrar',
-            'nameservers': 'nameservers',
-            'asn': 'asn',
-            'asn_description': 'asn_description',
-            'ssl_valid': 'ssl_valid',
-            'ssl_expiry': 'ssl_expiry',
-            'country': 'country',
-            'ip_address': 'ip_address',
-            'latitude': 'latitude',
-            'longitude': 'longitude',
-            'category': 'category',
-            'tags': 'tags'
-        }
-        
-        for field_name, db_field in field_mapping.items():
-            if domain_data.get(db_field) is None:
-                missing_fields.append(field_name)
-        
-        return missing_fields
+            return list(REQUIRED_FIELDS)
+        return [field for field in REQUIRED_FIELDS if domain_data.get(field) is None]
     
     def collect_missing_data(self, domain_name, missing_fields):
         """Collect missing data for a domain"""
@@ -124,38 +163,49 @@ class DomainDataFiller:
         collected_data = {'domain_name': domain_name}
         
         try:
+            # The collectors are independent network lookups, so the needed ones run concurrently
+            futures = []
+            mask = _fields_mask(missing_fields)
+            
             # Collect web data (title, description, favicon)
-            if any(field in missing_fields for field in ['title', 'description', 'favicon_url']):
-                web_data = self.collector._collect_web_data(domain_name)
-                if web_data:
-                    collected_data.update(web_data)
+            if mask & WEB_MASK:
+                futures.append(self._io_pool.submit(self.collector._collect_web_data, domain_name))
             
             # Collect WHOIS data
-            if any(field in missing_fields for field in ['created_date', 'expiry_date', 'registrar']):
-                whois_data = self.collector._collect_whois_data(domain_name)
-                if whois_data:
-                    collected_data.update(whois_data)
+            if mask & WHOIS_MASK:
+                futures.append(self._io_pool.submit(self.collector._collect_whois_data, domain_name))
+            
+            # Resolve the address once and share it between the DNS/ASN, SSL and geolocation steps
+            ip_address = None
+            if mask & (DNS_MASK | SSL_MASK | GEO_MASK):
+                try:
+                    ip_address = self.collector._resolve_ip(domain_name)
+                except socket.gaierror:
+                    logger.warning(f"Could not resolve IP address for {domain_name}")
             
             # Collect DNS data (nameservers, ASN)
-            if any(field in missing_fields for field in ['nameservers', 'asn', 'asn_description']):
-                dns_data = self.collector._collect_dns_data(domain_name)
-                if dns_data:
-                    collected_data.update(dns_data)
+            if mask & DNS_MASK:
+                futures.append(self._io_pool.submit(self.collector._collect_dns_data, domain_name, ip_address))
             
             # Collect SSL data
-            if any(field in missing_fields for field in ['ssl_valid', 'ssl_expiry']):
-                ssl_data = self.collector._collect_ssl_data(domain_name)
-                if ssl_data:
-                    collected_data.update(ssl_data)
+            if mask & SSL_MASK:
+                futures.append(self._io_pool.submit(self.collector._collect_ssl_data, domain_name, ip_address))
             
             # Collect geolocation data
-            if any(field in missing_fields for field in ['country', 'ip_address', 'latitude', 'longitude']):
-                geo_data = self.collector._collect_geolocation_data(domain_name)
-                if geo_data:
-                    collected_data.update(geo_data)
+            if mask & GEO_MASK:
+                futures.append(self._io_pool.submit(self.collector._collect_geolocation_data, domain_name, ip_address))
+            
+            # Merge in submission order; one failing collector does not discard the others
+            for future in futures:
+                try:
+                    data = future.result()
+                    if data:
+                        collected_data.update(data)
+                except Exception as e:
+                    logger.error(f"Error collecting data for {domain_name}: {e}")
             
-            # Add delay between requests to be respectful
-            time.sleep(COLLECTION_CONFIG.get('request_delay', 1))
+            # Add delay between requests to be respectful, cut short by a shutdown signal
+            self._shutdown_event.wait(timeout=COLLECTION_CONFIG.get('request_delay', 1))
             
             return collected_data
             
@@ -163,79 +213,177 @@ class DomainDataFiller:
             logger.error(f"Error collecting data for {domain_name}: {e}")
             return collected_data
     
-    def update_domain_data(self, domain_name, new_data):
-        """Update domain data in database"""
+    def _process_one_domain(self, domain_name, missing_fields):
+        """Collect missing data for one domain while holding its host semaphore"""
+        host = self.collector._get_main_domain(domain_name)
+        with self._host_sems_lock:
+            entry = self._host_sems.get(host)
+            if entry is None:
+                entry = self._host_sems[host] = [threading.Semaphore(1), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self.collect_missing_data(domain_name, missing_fields)
+        finally:
+            with self._host_sems_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._host_sems[host]
+    
+    def update_domains_data(self, batch):
+        """Update several domains in database with one bulk upsert"""
         try:
-            # Use the existing insert_domain method which handles upserts
-            domain_id = self.db.insert_domain(new_data)
-            logger.info(f"Updated domain {domain_name} with ID: {domain_id}")
+            self.db.bulk_upsert_domains(new_data for _, new_data in batch)
+            for domain_name, _ in batch:
+                logger.info(f"Successfully updated {domain_name}")
             return True
         except Exception as e:
-            logger.error(f"Error updating domain {domain_name}: {e}")
+            logger.error(f"Error updating {len(batch)} domains: {e}")
             return False
     
     def process_domains(self, max_domains=None, dry_run=False):
         """Process all domains and fill missing data"""
-        domains = self.get_all_domains()
+        if self.last_id:
+            logger.info(f"Resuming after domain ID {self.last_id}")
+        total_domains = self.count_domains(self.last_id)
+        logger.info(f"Found {total_domains} domains in database")
+        domains = self.get_all_domains(self.last_id)
         
         if max_domains:
-            domains = domains[:max_domains]
+            domains = islice(domains, max_domains)
+            total_domains = min(total_domains, max_domains)
         
-        logger.info(f"Processing {len(domains)} domains{' (dry run)' if dry_run else ''}")
+        logger.info(f"Processing {total_domains} domains{' (dry run)' if dry_run else ''}")
         
         processed_count = 0
         updated_count = 0
         error_count = 0
         
-        for domain in domains:
-            if self.shutdown_requested:
-                logger.info("Shutdown requested, stopping processing")
-                break
-            
-            domain_name = domain['domain_name']
-            domain_id = domain['id']
-            
-            logger.info(f"Processing domain {processed_count + 1}/{len(domains)}: {domain_name}")
-            
-            try:
-                # Get current domain data
-                current_data = self.get_domain_current_data(domain_name)
-                
-                # Identify missing fields
-                missing_fields = self.identify_missing_fields(current_data)
-                
-                if not missing_fields:
-                    logger.info(f"Domain {domain_name} already has complete data, skipping")
-                    processed_count += 1
-                    continue
-                
-                logger.info(f"Domain {domain_name} missing fields: {missing_fields}")
+        # Collection runs on the domain pool; database reads and writes stay on this thread
+        # because the connection is not thread-safe
+        in_flight = {}
+        pending_updates = []
+        pending_ids = []
+        
+        # Domains finish out of order, so the checkpoint only advances over the
+        # contiguous run of started domains whose results have been written
+        started_ids = deque()
+        done_ids = set()
+        
+        def mark_done(domain_ids):
+            done_ids.update(domain_ids)
+            while started_ids and started_ids[0] in done_ids:
+                done_ids.remove(started_ids[0])
+                self.last_id = started_ids.popleft()
+        
+        def save_checkpoint():
+            if not dry_run:
+                self.db.save_backfill_checkpoint(_CHECKPOINT_JOB, self.last_id)
+        
+        def flush_updates():
+            nonlocal updated_count, error_count
+            if not pending_updates:
+                return
+            if self.update_domains_data(pending_updates) or self.update_domains_data(pending_updates):
+                updated_count += len(pending_updates)
+                mark_done(pending_ids)
+            else:
+                # Leave these domains unfinished so the checkpoint never moves past them
+                error_count += len(pending_updates)
+                logger.error(f"Could not write {len(pending_updates)} domains, keeping the resume point before them")
+            pending_updates.clear()
+            pending_ids.clear()
+            save_checkpoint()
+        
+        def finish(done):
+            nonlocal processed_count, error_count
+            for future in done:
+                domain_id, domain_name = in_flight.pop(future)
+                processed_count += 1
+                try:
+                    pending_updates.append((domain_name, future.result()))
+                    pending_ids.append(domain_id)
+                except Exception as e:
+                    error_count += 1
+                    logger.error(f"Error processing domain {domain_name}: {e}")
+                    mark_done((domain_id,))
+            if len(pending_updates) >= _UPDATE_BATCH_SIZE:
+                flush_updates()
+        
+        index = 0
+        stopped_early = False
+        try:
+            for index, domain in enumerate(domains, 1):
+                if self.shutdown_requested:
+                    logger.info("Shutdown requested, stopping processing")
+                    stopped_early = True
+                    break
                 
-                if dry_run:
-                    logger.info(f"DRY RUN: Would collect missing data for {domain_name}")
-                    processed_count += 1
-                    continue
+                domain_name = domain['domain_name']
+                domain_id = domain['id']
+                started_ids.append(domain_id)
                 
-                # Collect missing data
-                new_data = self.collect_missing_data(domain_name, missing_fields)
+                logger.info(f"Processing domain {index}/{total_domains}: {domain_name}")
                 
-                # Update database
-                if self.update_domain_data(domain_name, new_data):
-                    updated_count += 1
-                    logger.info(f"Successfully updated {domain_name}")
-                else:
+                try:
+                    # Identify missing fields (the row already carries the domain's current data)
+                    missing_fields = self.identify_missing_fields(domain)
+                    
+                    if not missing_fields:
+                        logger.info(f"Domain {domain_name} already has complete data, skipping")
+                        processed_count += 1
+                        mark_done((domain_id,))
+                        continue
+                    
+                    logger.info(f"Domain {domain_name} missing fields: {missing_fields}")
+                    
+                    if dry_run:
+                        logger.info(f"DRY RUN: Would collect missing data for {domain_name}")
+                        processed_count += 1
+                        mark_done((domain_id,))
+                        continue
+                    
+                    # Keep at most parallel_domains collections in flight
+                    while len(in_flight) >= self._parallel_domains and not self.shutdown_requested:
+                        done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+                        finish(done)
+                    if self.shutdown_requested:
+                        logger.info("Shutdown requested, stopping processing")
+                        stopped_early = True
+                        break
+                    
+                    # Collect missing data
+                    future = self._domain_pool.submit(self._process_one_domain, domain_name, missing_fields)
+                    in_flight[future] = (domain_id, domain_name)
+                    
+                except Exception as e:
                     error_count += 1
-                    logger.error(f"Failed to update {domain_name}")
-                
-                processed_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Error processing domain {domain_name}: {e}")
-                processed_count += 1
+                    logger.error(f"Error processing domain {domain_name}: {e}")
+                    processed_count += 1
+                    mark_done((domain_id,))
+            
+        except Exception as e:
+            # A failed page read is not the end of the table; stop and keep the resume point
+            logger.error(f"Stopping after error reading domains: {e}")
+            stopped_early = True
+        
+        # Cancel collections that have not started yet, then save those that are running
+        if self.shutdown_requested:
+            for future in list(in_flight):
+                if future.cancel():
+                    in_flight.pop(future)
+        while in_flight:
+            done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+            finish(done)
+        flush_updates()
+        
+        # A run that reached the last domain starts over next time; otherwise keep the resume point
+        if not stopped_early and not self.shutdown_requested and (not max_domains or index < max_domains):
+            self.last_id = 0
+        save_checkpoint()
         
         logger.info(f"Processing complete:")
-        logger.info(f"  Total domains: {len(domains)}")
+        logger.info(f"  Total domains: {total_domains}")
         logger.info(f"  Processed: {processed_count}")
         logger.info(f"  Updated: {updated_count}")
         logger.info(f"  Errors: {error_count}")
@@ -244,6 +392,8 @@ class DomainDataFiller:
     
     def close(self):
         """Clean up resources"""
+        self._domain_pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
         if self.collector:
             self.collector.close()
         if self.db:
@@ -257,6 +407,7 @@ def main():
     parser.add_argument('--max-domains', type=int, help='Maximum number of domains to process')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be done without making changes')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
+    parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint and start from the first domain')
     
     args = parser.parse_args()
     
@@ -266,6 +417,10 @@ def main():
     filler = DomainDataFiller()
     
     try:
+        if args.restart:
+            filler.reset_checkpoint()
+        
+
         start_time = datetime.now()
         logger.info(f"Starting domain data filling process at {start_time}")
         
@@ -1,11 +1,14 @@
 import multiprocessing
+from multiprocessing.connection import wait as wait_for_processes
 import time
 import logging
 import argparse
 import signal
 import sys
+import threading
 import os
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
+from database import DatabaseManager
 from domain_collector import DomainCollector
 from config import COLLECTION_CONFIG, AUTO_UPDATE_CONFIG
 from version import __version__
@@ -18,17 +21,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# A continuous worker exits after this many batches and is replaced by a fresh process,
+# bounding memory growth from long-lived sessions, parsers and caches
+_MAX_BATCHES_PER_WORKER = 500
+
+# Exit code a worker uses to ask the parent to replace it
+_RECYCLE_EXIT_CODE = 3
+
+# Longest time a single domain's collection may take before it is failed (seconds)
+_DOMAIN_TIMEOUT = 300
+
+# Claims shrink to pending / (workers * _CLAIM_SPLIT) near the end of the queue so the
+# tail is spread over all free workers instead of sitting in one worker's batch
+_CLAIM_SPLIT = 8
+
+# Discovered URLs inserted per writer-thread round-trip, and how many may be waiting
+# before the collecting thread blocks until the writer catches up
+_WRITE_BATCH_SIZE = 500
+_WRITE_QUEUE_LIMIT = 10000
+
+# Default worker count is capped at this many workers per usable CPU; workers spend
+# much of their time waiting on the network, so some oversubscription is useful
+_WORKERS_PER_CPU = 2
+
+# Wait after a batch that found no work; doubled for each further empty batch, up to the cap (seconds)
+_IDLE_WAIT = 30
+_MAX_IDLE_WAIT = 300
+
+# Modules the forkserver imports once, so workers forked from it start with them loaded
+_WORKER_PRELOAD = ['config', 'database', 'domain_collector', 'requests', 'bs4']
+
 class ParallelQueueProcessor:
-    def __init__(self, worker_id=None, force_shutdown_after=3):
-        self.worker_id = worker_id or os.getpid()
+    def __init__(self, worker_id=None, force_shutdown_after=3, num_workers=1):
+        self.worker_id = worker_id if worker_id is not None else os.getpid()
+        self.num_workers = num_workers
         self.collector = DomainCollector()
-        self.shutdown_requested = False
+        # Set by the signal handler; waits on it return as soon as shutdown is requested
+        self._shutdown_event = threading.Event()
         self.signal_count = 0
         self.force_shutdown_after = force_shutdown_after
         
         # Create logger with worker ID
         self.logger = logging.getLogger(f"Worker-{self.worker_id}")
         
+        # Discovered URLs are handed to a writer thread with its own database connection,
+        # so queue inserts overlap with collecting the next domain
+        self._write_q = deque()
+        self._write_cond = threading.Condition()
+        self._writer_stop = False
+        self._writer_thread = threading.Thread(target=self._drain_writes, name=f"Writer-{self.worker_id}", daemon=True)
+        self._writer_thread.start()
+        
         # Set up signal handlers for graceful shutdown (all processes)
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -42,148 +85,172 @@ class ParallelQueueProcessor:
             self.logger.warning(f"Force shutdown after {self.signal_count} signals!")
             sys.exit(1)
         
-        self.shutdown_requested = True
+        self._shutdown_event.set()
+    
+    @property
+    def shutdown_requested(self):
+        """Whether a shutdown signal has been received"""
+        return self._shutdown_event.is_set()
+    
+    def _drain_writes(self):
+        """Writer thread: insert queued discovered URLs in batches until stopped and drained"""
+        db = DatabaseManager()
+        try:
+            while True:
+                with self._write_cond:
+                    while not self._write_q and not self._writer_stop:
+                        self._write_cond.wait()
+                    if not self._write_q:
+                        return
+                    items = [self._write_q.popleft() for _ in range(min(_WRITE_BATCH_SIZE, len(self._write_q)))]
+                    self._write_cond.notify_all()
+                try:
+                    self.collector.add_discovered_urls_to_queue(items, db=db)
+                except Exception as e:
+                    self.logger.error(f"Error writing {len(items)} discovered URLs: {e}")
+        finally:
+            db.close()
+    
+    def _queue_discoveries(self, discovered_urls):
+        """Hand discovered URLs to the writer thread, waiting while its backlog is full"""
+        with self._write_cond:
+            while len(self._write_q) >= _WRITE_QUEUE_LIMIT and self._writer_thread.is_alive():
+                self._write_cond.wait(timeout=1)
+            self._write_q.extend(discovered_urls)
+            self._write_cond.notify_all()
     
     def process_batch(self, batch_size, max_depth, write_discoveries=True, shutdown_check=None):
-        """Process a batch of domains from the queue"""
+        """Process a batch of domains from the queue; returns (processed, discoveries, claimed) counts"""
         if shutdown_check is None:
             shutdown_check = lambda: self.shutdown_requested
         
         processed_count = 0
         discoveries_count = 0
+        delay = COLLECTION_CONFIG['request_delay']
         
         try:
             # Get domains from queue
-            domains = self.collector.db.get_next_from_queue(batch_size)
+            domains = self.collector.db.get_next_from_queue(batch_size, worker_id=self.worker_id,
+                                                            num_workers=self.num_workers)
             
             if not domains:
                 self.logger.info("No domains in queue to process")
-                return 0, 0
+                return 0, 0, 0
             
             self.logger.info(f"Processing batch of {len(domains)} domains")
             
-            for domain_data in domains:
-                if shutdown_check():
-                    self.logger.info("Shutdown requested, stopping batch processing")
-                    break
-                
-                try:
-                    domain_name = domain_data['domain_name']
-                    depth = domain_data.get('depth', 0)
-                    source_domain_id = domain_data.get('source_domain_id')
-                    
-                    # Skip if depth exceeds max_depth
-                    if depth > max_depth:
-                        self.logger.info(f"Skipping {domain_name} (depth {depth} > {max_depth})")
-                        continue
+            # Load robots.txt rules for the batch's hosts from the shared table, fetching and
+            # storing the missing ones, so per-domain checks hit the in-process cache
+            try:
+                self.collector._prefetch_robots_rules(d['domain_name'] for d in domains)
+            except Exception as e:
+                self.logger.warning(f"Could not prefetch robots.txt rules: {e}")
+            
+            # Completions are written once at the end of the batch
+            completions = []
+            
+            try:
+                for domain_data in domains:
+                    if shutdown_check():
+                        self.logger.info("Shutdown requested, stopping batch processing")
+                        break
                     
-                    # Collect domain data with timeout
                     try:
-                        import threading
-                        import queue
-                        
-                        result_queue = queue.Queue()
-                        exception_queue = queue.Queue()
+                        domain_name = domain_data['domain_name']
+                        depth = domain_data.get('depth', 0)
+                        source_domain_id = domain_data.get('source_domain_id')
                         
-                        def collect_with_timeout():
-                            try:
-                                result = self.collector.collect_domain_data(
-                                    domain_name, 
-                                    depth=depth, 
-                                    url=domain_data.get('url'),
-                                    shutdown_check=shutdown_check,
-                                    write_discoveries=write_discoveries
-                                )
-                                result_queue.put(result)
-                            except Exception as e:
-                                exception_queue.put(e)
+                        # Skip if depth exceeds max_depth
+                        if depth > max_depth:
+                            self.logger.info(f"Skipping {domain_name} (depth {depth} > {max_depth})")
+                            continue
                         
-                        # Start collection in a thread
-                        collection_thread = threading.Thread(target=collect_with_timeout)
-                        collection_thread.daemon = True
-                        collection_thread.start()
+                        # Collect domain data; the collector raises TimeoutError once the deadline passes.
+                        # Discoveries come back through the sink and are written by the writer thread
+                        discovered_urls = []
+                        try:
+                            domain_id, relationships = self.collector.collect_domain_data(
+                                domain_name, 
+                                depth=depth, 
+                                url=domain_data.get('url'),
+                                shutdown_check=shutdown_check,
+                                write_discoveries=False,
+                                deadline=time.monotonic() + _DOMAIN_TIMEOUT,
+                                discovery_sink=discovered_urls
+                            )
+                            
+                        except KeyboardInterrupt:
+                            self.logger.info("Domain collection interrupted by user")
+                            raise
+                        except TimeoutError:
+                            self.logger.error(f"Domain collection timed out for {domain_name}")
+                            raise
+                        except Exception as e:
+                            if shutdown_check():
+                                self.logger.info("Domain collection interrupted due to shutdown request")
+                                raise KeyboardInterrupt()
+                            raise
                         
-                        # Wait for result with timeout
-                        timeout_seconds = 300  # 5 minutes timeout
-                        collection_thread.join(timeout=timeout_seconds)
+                        # Mark as completed
+                        completions.append((domain_data['id'], True, None))
                         
-                        if collection_thread.is_alive():
-                            self.logger.warning(f"Domain collection for {domain_name} timed out after {timeout_seconds} seconds")
-                            raise TimeoutError(f"Domain collection timed out after {timeout_seconds} seconds")
+                        processed_count += 1
                         
-                        if not exception_queue.empty():
-                            raise exception_queue.get()
+                        # Add discovered URLs to queue if enabled
+                        if write_discoveries and discovered_urls:
+                            self._queue_discoveries(discovered_urls)
+                            discoveries_count += len(discovered_urls)
                         
-                        domain_id, relationships = result_queue.get()
+                        # Add delay between requests, cut short by a shutdown signal
+                        if delay:
+                            self._shutdown_event.wait(timeout=delay)
                         
-                    except KeyboardInterrupt:
-                        self.logger.info("Domain collection interrupted by user")
-                        raise
-                    except TimeoutError:
-                        self.logger.error(f"Domain collection timed out for {domain_name}")
-                        raise
                     except Exception as e:
-                        if shutdown_check():
-                            self.logger.info("Domain collection interrupted due to shutdown request")
-                            raise KeyboardInterrupt()
-                        raise
-                    
-                    # Mark as completed
-                    self.collector.db.mark_queue_item_completed(domain_data['id'], success=True)
-                    
-                    processed_count += 1
-                    
-                    # Add discovered URLs to queue if enabled
-                    if write_discoveries and relationships:
-                        discovered_urls = []
-                        for rel in relationships:
-                            if rel.get('target'):
-                                discovered_urls.append({
-                                    'url': rel.get('link_url', f"http://{rel['target']}"),
-                                    'domain_name': rel['target'],
-                                    'source_domain_id': domain_id,
-                                    'depth': depth + 1
-                                })
-                        
-                        if discovered_urls:
-                            self.collector.add_discovered_urls_to_queue(discovered_urls, depth + 1)
-                            discoveries_count += len(discovered_urls)
-                            self.logger.info(f"Added {len(discovered_urls)} discovered URLs to queue")
-                    
-                    # Add delay between requests with shutdown check
-                    for _ in range(int(COLLECTION_CONFIG['request_delay'])):
-                        if shutdown_check():
-                            break
-                        time.sleep(1)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing {domain_data.get('domain_name', 'unknown')}: {e}")
-                    # Mark as failed
-                    self.collector.db.mark_queue_item_completed(domain_data['id'], success=False, error_message=str(e))
+                        self.logger.error(f"Error processing {domain_data.get('domain_name', 'unknown')}: {e}")
+                        # Mark as failed
+                        completions.append((domain_data['id'], False, str(e)))
+            finally:
+                # Record finished items even when the batch is interrupted
+                if completions:
+                    self.collector.db.bulk_mark_completed(completions)
             
             self.logger.info(f"Batch completed - processed {processed_count}, discoveries {discoveries_count}")
-            return processed_count, discoveries_count
+            return processed_count, discoveries_count, len(domains)
             
         except Exception as e:
             self.logger.error(f"Batch processing failed: {e}")
-            return 0, 0
+            return 0, 0, 0
+    
+    def _claim_size(self, stats, batch_size):
+        """Number of queue items to claim, reduced when little work is left"""
+        pending = stats.get('pending')
+        if not pending:
+            return batch_size
+        return max(1, min(batch_size, pending // (self.num_workers * _CLAIM_SPLIT)))
     
-    def run_continuous(self, batch_size, max_depth, write_discoveries=True):
-        """Run continuous processing with batches"""
+    def run_continuous(self, batch_size, max_depth, write_discoveries=True, max_batches=None):
+        """Run continuous processing with batches; returns True if it stopped after max_batches"""
         self.logger.info(f"Starting continuous processing (batch_size={batch_size}, max_depth={max_depth})")
         
         total_processed = 0
         total_discoveries = 0
+        batches_run = 0
+        idle_wait = _IDLE_WAIT
         
         try:
             while not self.shutdown_requested:
+                if max_batches and batches_run >= max_batches:
+                    self.logger.info(f"Processed {batches_run} batches, handing over to a fresh worker")
+                    return True
+                batches_run += 1
+                
                 # Get queue statistics
                 stats = self.collector.db.get_queue_stats()
                 self.logger.info(f"Queue stats: {stats}")
                 
                 # Process batch
-                processed, discoveries = self.process_batch(
-                    batch_size, 
+                processed, discoveries, claimed = self.process_batch(
+                    self._claim_size(stats, batch_size), 
                     max_depth, 
                     write_discoveries,
                     lambda: self.shutdown_requested
@@ -192,16 +259,13 @@ class ParallelQueueProcessor:
                 total_processed += processed
                 total_discoveries += discoveries
                 
-                if processed == 0:
-                    # No work to do, wait a bit
-                    self.logger.info("No work available, waiting 30 seconds...")
-                    for _ in range(30):
-                        if self.shutdown_requested:
-                            break
-                        time.sleep(1)
-                        # Check for shutdown more frequently
-                        if self.shutdown_requested:
-                            break
+                if claimed == 0:
+                    # No work to claim, wait a bit longer each time the queue is found empty
+                    self.logger.info(f"No work available, waiting {idle_wait} seconds...")
+                    self._shutdown_event.wait(timeout=idle_wait)
+                    idle_wait = min(idle_wait * 2, _MAX_IDLE_WAIT)
+                else:
+                    idle_wait = _IDLE_WAIT
                 
         except KeyboardInterrupt:
             self.logger.info("Interrupted by user")
@@ -209,32 +273,34 @@ class ParallelQueueProcessor:
             self.logger.error(f"Continuous processing failed: {e}")
         finally:
             self.logger.info(f"Shutdown complete - total processed: {total_processed}, total discoveries: {total_discoveries}")
-            self.collector.close()
+            self.close()
+        return False
+    
+    def close(self):
+        """Let the writer thread flush pending discoveries, then release resources"""
+        with self._write_cond:
+            self._writer_stop = True
+            self._write_cond.notify_all()
+        self._writer_thread.join()
+        self.collector.close()
     
     def add_seed_domains(self, domains, priority=1):
         """Add seed domains to the queue"""
         self.logger.info(f"Adding {len(domains)} seed domains to queue")
         
-        for domain in domains:
-            try:
-                self.collector.db.add_to_discovery_queue(
-                    url=f"http://{domain}",
-                    domain_name=domain,
-                    source_domain_id=None,
-                    depth=0,
-                    priority=priority
-                )
-                self.logger.info(f"Added {domain} to queue")
-            except Exception as e:
-                self.logger.error(f"Error adding {domain} to queue: {e}")
+        rows = [(f"http://{domain}", domain, None, 0, priority) for domain in domains]
+        added_count = self.collector.db.add_many_to_discovery_queue(rows)
+        self.logger.info(f"Added {added_count} seed domains to queue")
 
 
-def worker_process(worker_id, batch_size, max_depth, write_discoveries, continuous):
+def worker_process(worker_id, batch_size, max_depth, write_discoveries, continuous, num_workers=1):
     """Worker process function"""
-    processor = ParallelQueueProcessor(worker_id)
+    processor = ParallelQueueProcessor(worker_id, num_workers=num_workers)
+    recycle = False
     try:
         if continuous:
-            processor.run_continuous(batch_size, max_depth, write_discoveries)
+            recycle = processor.run_continuous(batch_size, max_depth, write_discoveries,
+                                               max_batches=_MAX_BATCHES_PER_WORKER)
         else:
             processor.process_batch(batch_size, max_depth, write_discoveries)
     except KeyboardInterrupt:
@@ -243,9 +309,28 @@ def worker_process(worker_id, batch_size, max_depth, write_discoveries, continuo
         logger.error(f"Worker {worker_id} failed: {e}")
     finally:
         try:
-            processor.collector.close()
+            processor.close()
         except Exception as e:
             logger.error(f"Worker {worker_id} error during cleanup: {e}")
+    if recycle:
+        sys.exit(_RECYCLE_EXIT_CODE)
+
+
+def available_cpus():
+    """Number of CPUs this process may run on, honouring affinity and container limits"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_worker_count():
+    """Configured worker count, capped by the CPUs actually available"""
+    configured = COLLECTION_CONFIG['parallel_workers']
+    limit = _WORKERS_PER_CPU * available_cpus()
+    if configured > limit:
+        logger.warning(f"Configured {configured} workers but only {available_cpus()} CPUs are available, using {limit}")
+        return limit
+    return configured
 
 
 def run_parallel_processing(num_workers, batch_size, max_depth, write_discoveries=True, continuous=False):
@@ -253,7 +338,16 @@ def run_parallel_processing(num_workers, batch_size, max_depth, write_discoverie
     logger.info(f"Starting parallel processing with {num_workers} workers")
     logger.info(f"Configuration: batch_size={batch_size}, max_depth={max_depth}, write_discoveries={write_discoveries}, continuous={continuous}")
     
-    # Start worker processes
+    # Fork workers from a forkserver that has the crawler stack preloaded, rather than copying
+    # this process (fork) or re-importing everything in each worker (spawn)
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(_WORKER_PRELOAD)
+    else:
+        ctx = multiprocessing.get_context()
+    
+    # Start worker processes (worker id -> process)
+    workers = {}
     processes = []
     shutdown_requested = False
     
@@ -271,20 +365,34 @@ def run_parallel_processing(num_workers, batch_size, max_depth, write_discoverie
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    def start_worker(i):
+        p = ctx.Process(
+            target=worker_process,
+            args=(i, batch_size, max_depth, write_discoveries, continuous, num_workers)
+        )
+        p.start()
+        workers[i] = p
+        processes.append(p)
+        logger.info(f"Started worker {i}")
+    
     try:
         for i in range(num_workers):
-            p = multiprocessing.Process(
-                target=worker_process,
-                args=(i, batch_size, max_depth, write_discoveries, continuous)
-            )
-            p.start()
-            processes.append(p)
-            logger.info(f"Started worker {i}")
+            start_worker(i)
         
-        # Wait for all processes to finish
-        for i, p in enumerate(processes):
-            p.join()
-            logger.info(f"Worker {i} finished")
+        # Wait for workers to finish, replacing those that exit to be recycled
+        while workers:
+            wait_for_processes([p.sentinel for p in workers.values()])
+            for i, p in list(workers.items()):
+                if p.is_alive():
+                    continue
+                p.join()
+                processes.remove(p)
+                del workers[i]
+                if p.exitcode == _RECYCLE_EXIT_CODE and not shutdown_requested:
+                    logger.info(f"Recycling worker {i}")
+                    start_worker(i)
+                else:
+                    logger.info(f"Worker {i} finished")
             
     except KeyboardInterrupt:
         logger.info("Main process interrupted, terminating workers...")
@@ -316,13 +424,10 @@ def run_parallel_processing(num_workers, batch_size, max_depth, write_discoverie
 
 def main():
     print(f"[WebtheNet] Parallel Data Crawler Version: {__version__}")
-    # Start auto-update checker
-    auto_updater = AutoUpdate(AUTO_UPDATE_CONFIG, __version__, graceful_restart_callback)
-    auto_updater.start_periodic_check()
 
     parser = argparse.ArgumentParser(description='Process domain discovery queue in parallel')
-    parser.add_argument('--workers', type=int, default=COLLECTION_CONFIG.get('parallel_workers', 4), 
-                       help='Number of worker processes')
+    parser.add_argument('--workers', type=int, 
+                       help='Number of worker processes (default: COLLECTION_PARALLEL_WORKERS, capped by available CPUs)')
     parser.add_argument('--batch-size', type=int, default=10, 
                        help='Number of domains to process per batch per worker')
     parser.add_argument('--max-depth', type=int, default=COLLECTION_CONFIG['max_depth'], 
@@ -342,16 +447,23 @@ def main():
     if args.add_seeds:
         processor = ParallelQueueProcessor()
         processor.add_seed_domains(args.add_seeds)
-        processor.collector.close()
+        processor.close()
+    
+    # Start auto-update checker; it runs in this supervising process only, never in the workers
+    auto_updater = AutoUpdate(AUTO_UPDATE_CONFIG, __version__, graceful_restart_callback)
+    auto_updater.start_periodic_check()
     
     # Run parallel processing
-    run_parallel_processing(
-        num_workers=args.workers,
-        batch_size=args.batch_size,
-        max_depth=args.max_depth,
-        write_discoveries=not args.no_discoveries,
-        continuous=args.continuous
-    )
+    try:
+        run_parallel_processing(
+            num_workers=args.workers or default_worker_count(),
+            batch_size=args.batch_size,
+            max_depth=args.max_depth,
+            write_discoveries=not args.no_discoveries,
+            continuous=args.continuous
+        )
+    finally:
+        auto_updater.stop()
 
 
 if __name__ == "__main__":
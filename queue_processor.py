@@ -1,8 +1,8 @@
-import time
 import logging
 import argparse
 import signal
 import sys
+import threading
 from domain_collector import DomainCollector
 from config import COLLECTION_CONFIG, AUTO_UPDATE_CONFIG
 from version import __version__
@@ -11,10 +11,15 @@ from auto_update import AutoUpdate, graceful_restart_callback
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Wait between queue checks; doubled after each check that finds nothing pending, up to the cap (seconds)
+_POLL_INTERVAL = 60
+_MAX_IDLE_WAIT = 300
+
 class QueueProcessor:
     def __init__(self, force_shutdown_after=3):
         self.collector = DomainCollector()
-        self.shutdown_requested = False
+        # Set by the signal handler; waits on it return as soon as shutdown is requested
+        self._shutdown_event = threading.Event()
         self.signal_count = 0
         self.force_shutdown_after = force_shutdown_after
         
@@ -31,7 +36,12 @@ class QueueProcessor:
             logger.warning(f"Force shutdown after {self.signal_count} signals!")
             sys.exit(1)
         
-        self.shutdown_requested = True
+        self._shutdown_event.set()
+    
+    @property
+    def shutdown_requested(self):
+        """Whether a shutdown signal has been received"""
+        return self._shutdown_event.is_set()
     
     def run(self, max_items=None, max_depth=None, continuous=False):
         """Run the queue processor"""
@@ -42,6 +52,7 @@ class QueueProcessor:
         
         logger.info(f"Starting queue processor with max_items={max_items}, max_depth={max_depth}, continuous={continuous}")
         
+        idle_wait = _POLL_INTERVAL
         try:
             while not self.shutdown_requested:
                 # Get queue statistics
@@ -59,17 +70,15 @@ class QueueProcessor:
                     logger.info("Queue processing completed")
                     break
                 
-                # Check for shutdown before waiting
-                if self.shutdown_requested:
-                    logger.info("Shutdown requested, stopping queue processing")
-                    break
-                
-                # Wait before next iteration
-                logger.info("Waiting 60 seconds before next queue check...")
-                for _ in range(60):
-                    if self.shutdown_requested:
-                        break
-                    time.sleep(1)
+                # Wait before next iteration, backing off while the queue stays empty
+                if stats.get('pending'):
+                    idle_wait = _POLL_INTERVAL
+                    wait_time = _POLL_INTERVAL
+                else:
+                    wait_time = idle_wait
+                    idle_wait = min(idle_wait * 2, _MAX_IDLE_WAIT)
+                logger.info(f"Waiting {wait_time} seconds before next queue check...")
+                self._shutdown_event.wait(timeout=wait_time)
                 
         except KeyboardInterrupt:
             logger.info("Queue processor interrupted by user")
@@ -84,25 +93,13 @@ class QueueProcessor:
         """Add seed domains to the queue"""
         logger.info(f"Adding {len(domains)} seed domains to queue")
         
-        for domain in domains:
-            try:
-                self.collector.db.add_to_discovery_queue(
-                    url=f"http://{domain}",
-                    domain_name=domain,
-                    source_domain_id=None,
-                    depth=0,
-                    priority=priority
-                )
-                logger.info(f"Added {domain} to queue")
-            except Exception as e:
-                logger.error(f"Error adding {domain} to queue: {e}")
+        rows = [(f"http://{domain}", domain, None, 0, priority) for domain in domains]
+        added_count = self.collector.db.add_many_to_discovery_queue(rows)
+        logger.info(f"Added {added_count} seed domains to queue")
 
 
 def main():
     print(f"[WebtheNet] Data Crawler Version: {__version__}")
-    # Start auto-update checker
-    auto_updater = AutoUpdate(AUTO_UPDATE_CONFIG, __version__, graceful_restart_callback)
-    auto_updater.start_periodic_check()
 
     parser = argparse.ArgumentParser(description='Process domain discovery queue')
     parser.add_argument('--max-items', type=int, default=COLLECTION_CONFIG['max_items'], help='Maximum items to process per batch')
@@ -119,12 +116,19 @@ def main():
     if args.add_seeds:
         processor.add_seed_domains(args.add_seeds)
     
+    # Start auto-update checker
+    auto_updater = AutoUpdate(AUTO_UPDATE_CONFIG, __version__, graceful_restart_callback)
+    auto_updater.start_periodic_check()
+    
     # Run the processor
-    processor.run(
-        max_items=args.max_items,
-        max_depth=args.max_depth,
-        continuous=args.continuous
-    )
+    try:
+        processor.run(
+            max_items=args.max_items,
+            max_depth=args.max_depth,
+            continuous=args.continuous
+        )
+    finally:
+        auto_updater.stop()
 
 
 if __name__ == "__main__":
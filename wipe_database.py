@@ -29,49 +29,33 @@ def wipe_database():
         
         logger.info(f"Found tables: {tables}")
         
-        # Disable foreign key checks temporarily
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        # Truncate all tables with foreign key checks disabled, in a single round-trip;
+        # TRUNCATE also resets the auto-increment counters
+        statements = ["SET FOREIGN_KEY_CHECKS = 0"]
+        statements.extend(f"TRUNCATE TABLE `{table}`" for table in tables)
+        statements.append("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.execute("; ".join(statements))
         
-        # Truncate all tables
+        # Step through the result of each statement so all of them run
         for table in tables:
-            try:
-                cursor.execute(f"TRUNCATE TABLE {table}")
-                logger.info(f"Truncated table: {table}")
-            except Exception as e:
-                logger.warning(f"Could not truncate {table}: {e}")
-        
-        # Re-enable foreign key checks
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-        
-        # Reset auto-increment counters
-        for table in tables:
-            try:
-                cursor.execute(f"ALTER TABLE {table} AUTO_INCREMENT = 1")
-                logger.info(f"Reset auto-increment for: {table}")
-            except Exception as e:
-                logger.warning(f"Could not reset auto-increment for {table}: {e}")
+            cursor.nextset()
+            logger.info(f"Truncated table: {table}")
+        cursor.nextset()
         
         db.connection.commit()
         logger.info("Database wipe completed successfully!")
         
         # Show final table status
-        cursor.execute("SELECT COUNT(*) as count FROM domains")
-        domain_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) as count FROM relationships")
-        relationship_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) as count FROM discovery_queue")
-        queue_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) as count FROM collection_logs")
-        log_count = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT 'Domains', COUNT(*) FROM domains
+            UNION ALL SELECT 'Relationships', COUNT(*) FROM relationships
+            UNION ALL SELECT 'Queue items', COUNT(*) FROM discovery_queue
+            UNION ALL SELECT 'Collection logs', COUNT(*) FROM collection_logs
+        """)
         
         logger.info(f"Final counts:")
-        logger.info(f"  Domains: {domain_count}")
-        logger.info(f"  Relationships: {relationship_count}")
-        logger.info(f"  Queue items: {queue_count}")
-        logger.info(f"  Collection logs: {log_count}")
+        for label, count in cursor.fetchall():
+            logger.info(f"  {label}: {count}")
         
         return True
         